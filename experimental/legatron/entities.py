@@ -15,7 +15,7 @@ from billy.core import db
 from billy.utils import metadata
 from billy.core import settings
 
-from trie_utils import Trie, trie_add, trie_scan
+from openstates.utils.trie import Trie, trie_add, trie_scan
 from utils import cd, cartcat, clean_html
 
 
@@ -1,3 +1,5 @@
+import os
+import sys
 from os.path import join, abspath, dirname
 import json
 
@@ -53,18 +55,22 @@ if __name__ == '__main__':
     renderer = lambda obj: templates['bills'].render(obj=obj)
     index.add('b', objects, renderer, substrs=True, storekeys=storekeys)
 
-    jd = index.jsondata()
-    js = index.as_json(showsizes=True)
-
     ROOT = 'build/index/'
 
     # I hate doing this.
     HERE = dirname(abspath(__file__))
     index_dir = join(HERE, ROOT)
 
-    for stem, stem_id in index.stem2id.items():
-        import ipdb;ipdb.set_trace()
-        results = index.index[stem_id]
+    # index.json is only (re)written when asked for, e.g. by the Makefile.
+    if '--dump' in sys.argv[1:]:
+        with open(join(HERE, 'index.json'), 'w') as f:
+            index.dump(f, showsizes=True)
+    else:
+        index.as_json(showsizes=True)
+
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    for stem, stem_id, results in index.entries():
         second = itemgetter(2)
         types = map(second, results)
         bills_count = types.count('B')
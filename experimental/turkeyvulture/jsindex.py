@@ -12,41 +12,95 @@ For each term--
 
 If the result is not huge, expand the search index to include fragments
 of stemmed words as well.
+
+Fragments aren't stored one by one: each distinct word keeps a posting
+list of the objects it occurs in, and a fragment is looked up by finding
+the words that contain it (through a table of the words' bigrams and
+trigrams) or start with it (by bisecting the sorted words). Posting
+lists are sorted arrays of small integers, one per object. dump()
+writes those tables rather than every fragment, so index.json grows
+with the words, not their substrings, and the page looks fragments up
+the same way. fragments() and entries() still spell every fragment out,
+one at a time, for build_index.py's per-key files.
 '''
 import sys
 import json
+import array
+import bisect
 import collections
-import itertools
 import time
 import datetime
 import re
 import nltk
 
 
+def postings():
+    return array.array('I')
+
+
+def post(nums, n):
+    '''Adds object number `n` to a posting list. Objects are numbered as
+    they're added, so this is almost always an append. Returns False if
+    the list has to be sorted again.'''
+    if not nums or nums[-1] < n:
+        nums.append(n)
+    elif nums[-1] != n:
+        nums.append(n)
+        return False
+    return True
+
+
+def grams(word):
+    '''The distinct bigrams and trigrams in `word`.'''
+    w_len = len(word)
+    found = set(word[i:i + 2] for i in xrange(w_len - 1))
+    found.update(word[i:i + 3] for i in xrange(w_len - 2))
+    return found
+
+
 class IndexBuilder(object):
 
     def __init__(self):
-        self.stem2id = {}
-        self.index = collections.defaultdict(lambda: set())
-        self.tails = collections.defaultdict(lambda: set())
         self.stemmer = nltk.stem.porter.PorterStemmer()
         self.stopwords = set(nltk.corpus.stopwords.words('english'))
         self.stem_word = self.stemmer.stem_word
         self.f = lambda _s: len(_s) > 1
-        self.new_id = itertools.count()
         self.objects = {}
 
-    def get_stem_id(self, stem):
+        # Objects are numbered in the order they're added.
+        self.object_ids = []
+        self.object_nums = {}
+
+        # term -> objects, for stems and whole words.
+        self.terms = collections.defaultdict(postings)
+        self.tails = collections.defaultdict(set)
+
+        # word -> objects, for words whose substrings (or prefixes
+        # only) are searchable.
+        self.substr_words = collections.defaultdict(postings)
+        self.prefix_words = collections.defaultdict(postings)
 
-        # Get the stem's id (normalize stems)
+        # gram -> numbers of the words in substr_words containing it.
+        self.word_list = []
+        self.word_nums = {}
+        self.grams = collections.defaultdict(postings)
+
+        self.unsorted = set()
+        self._sorted_prefix_words = None
+
+    def get_object_num(self, object_id):
         try:
-            stem_id = self.stem2id[stem]
+            return self.object_nums[object_id]
         except KeyError:
-            stem_id = self.stem2id[stem] = self.new_id.next()
+            num = self.object_nums[object_id] = len(self.object_ids)
+            self.object_ids.append(object_id)
+            return num
 
-        return stem_id
+    def _post(self, table, key, num):
+        if not post(getattr(self, table)[key], num):
+            self.unsorted.add((table, key))
 
-    def _add_word(self, word, object_id, do_stem=True):
+    def _add_word(self, word, num, do_stem=True):
 
         # Get the stem and tail.
         if do_stem:
@@ -55,25 +109,31 @@ class IndexBuilder(object):
         else:
             stem = word
 
-        stem_id = self.get_stem_id(stem)
-
         # Augment the index collection.
-        self.index[stem_id].add(object_id)
+        self._post('terms', stem, num)
 
         # Augment the tail collection.
         if do_stem and tail:
-            self.tails[stem_id].add(tail)
+            self.tails[stem].add(tail)
 
         # If stem diffs from word, add word as well.
         if stem != word:
-            stem_id = self.get_stem_id(word)
-            self.index[stem_id].add(object_id)
+            self._post('terms', word, num)
+
+    def _add_substrs(self, word, num):
+        if word not in self.word_nums:
+            word_num = self.word_nums[word] = len(self.word_list)
+            self.word_list.append(word)
+            for gram in grams(word):
+                self.grams[gram].append(word_num)
+        self._post('substr_words', word, num)
 
     def add(self, object_type, objects, text_func=None, substrs=False,
             all_substrs=False, storekeys=None):
 
         object_store = self.objects
-        #more_text = self.more_text
+        add_word = self._add_word
+        self._sorted_prefix_words = None
         for obj in objects:
 
             id_ = obj['_id']
@@ -82,38 +142,112 @@ class IndexBuilder(object):
             else:
                 obj_ = obj
             object_store[id_] = obj_
+            num = self.get_object_num(id_)
 
             text = text_func(obj)
 
-            #text += more_text(obj)
-
             words = set(filter(self.f, re.findall(r'\w+', text.lower())))
             words = words - self.stopwords
-            add_word = self._add_word
 
             for w in words:
 
-                add_word(w, id_)
+                add_word(w, num)
 
                 if all_substrs:
-                    for substring in substrings(w):
-                        add_word(substring, id_, do_stem=False)
+                    self._add_substrs(w, num)
 
                 elif substrs:
-                    for substring in substrings(w, from_beginning_only=True):
-                        add_word(substring, id_, do_stem=False)
+                    self._post('prefix_words', w, num)
 
-    @property
-    def id2stem(self):
-        return dict(t[::-1] for t in self.stem2id.items())
+    def _sort_postings(self):
+        if not self.unsorted:
+            return
+        for name, key in self.unsorted:
+            table = getattr(self, name)
+            table[key] = array.array('I', sorted(set(table[key])))
+        self.unsorted.clear()
+
+    def words_containing(self, fragment):
+        '''Words whose substrings are indexed that contain `fragment`.'''
+        if len(fragment) < 2:
+            return []
+        if len(fragment) < 4:
+            candidates = self.grams.get(fragment, ())
+        else:
+            # Only the rarest trigram's words need checking.
+            trigrams = [fragment[i:i + 3] for i in
+                        xrange(len(fragment) - 2)]
+            candidates = min((self.grams.get(t, ()) for t in trigrams),
+                             key=len)
+        words = self.word_list
+        if len(fragment) < 4:
+            return [words[n] for n in candidates]
+        return [words[n] for n in candidates if fragment in words[n]]
+
+    def words_starting(self, prefix):
+        '''Words whose prefixes are indexed that start with `prefix`.'''
+        if len(prefix) < 2:
+            return []
+        if self._sorted_prefix_words is None:
+            self._sorted_prefix_words = sorted(self.prefix_words)
+        words = self._sorted_prefix_words
+        i = bisect.bisect_left(words, prefix)
+        found = []
+        while i < len(words) and words[i].startswith(prefix):
+            found.append(words[i])
+            i += 1
+        return found
+
+    def lookup(self, key):
+        '''The numbers of the objects a search for `key` (a stem, word or
+        fragment) matches.'''
+        self._sort_postings()
+        nums = set()
+        if key in self.terms:
+            nums.update(self.terms[key])
+        for word in self.words_containing(key):
+            nums.update(self.substr_words[word])
+        for word in self.words_starting(key):
+            nums.update(self.prefix_words[word])
+        return nums
+
+    def fragments(self):
+        '''Every key a search can match, sorted: the stems and words,
+        and the fragments of the words whose fragments are searchable.
+        Its position in this list is a key's stem id.'''
+        keys = set(self.terms)
+        for word in self.substr_words:
+            keys.update(substrings(word))
+        for word in self.prefix_words:
+            keys.update(substrings(word, from_beginning_only=True))
+        return sorted(keys)
+
+    def entries(self, keys=None):
+        '''(key, stem_id, object ids) for every key, one at a time.'''
+        object_ids = self.object_ids
+        for stem_id, key in enumerate(keys or self.fragments()):
+            nums = sorted(self.lookup(key))
+            yield key, stem_id, [object_ids[n] for n in nums]
 
     def jsondata(self):
+        '''Everything dump() writes, as one dict. Fragments aren't
+        spelled out: the posting lists, the words whose fragments are
+        searchable and their gram table are written as they are, and a
+        reader looks a fragment up the way lookup() does (index.html's
+        lookup does it in javascript). Object numbers index object_ids.'''
+        self._sort_postings()
+
+        def lists(table):
+            return dict((k, v.tolist()) for (k, v) in table.iteritems())
 
         return {
-            'stem2id': self.stem2id,
-            'id2stem': self.id2stem,
-            'index': dict((k, list(v)) for (k, v) in self.index.items()),
-            'tails': dict((k, list(v)) for (k, v) in self.tails.items()),
+            'object_ids': self.object_ids,
+            'terms': lists(self.terms),
+            'substr_words': lists(self.substr_words),
+            'prefix_words': lists(self.prefix_words),
+            'words': self.word_list,
+            'grams': lists(self.grams),
+            'tails': dict((k, sorted(v)) for (k, v) in self.tails.items()),
             'objects': self.objects
             }
 
@@ -126,18 +260,39 @@ class IndexBuilder(object):
                 print 'size of', k, humanize_bytes(sys.getsizeof(js))
         return data
 
-    def dump(self, fp):
-        json.dump(self.jsondata(), fp, cls=JSONDateEncoder)
+    def dump(self, fp, showsizes=False):
+        json.dump(self.as_json(showsizes), fp, cls=JSONDateEncoder)
+
+    @classmethod
+    def load(cls, fp):
+        '''An index that answers lookup() from what dump() wrote.'''
+        data = json.load(fp)
+        index = cls()
+        index.objects = data['objects']
+        index.object_ids = data['object_ids']
+        index.object_nums = dict(
+            (id_, n) for (n, id_) in enumerate(index.object_ids))
+        for name in ('terms', 'substr_words', 'prefix_words', 'grams'):
+            table = getattr(index, name)
+            for k, v in data[name].iteritems():
+                table[k] = array.array('I', v)
+        index.word_list = data['words']
+        index.word_nums = dict(
+            (word, n) for (n, word) in enumerate(index.word_list))
+        for k, v in data['tails'].iteritems():
+            index.tails[k] = set(v)
+        return index
 
     def query(self, word):
         stem = self.stem_word(word)
-        stem_id = self.stem2id[stem]
-        return self.index[stem_id]
+        nums = self.lookup(stem)
+        if not nums:
+            raise KeyError(stem)
+        object_ids = self.object_ids
+        return set(object_ids[n] for n in nums)
 
     def qq(self, word):
-        stem = self.stem_word(word)
-        stem_id = self.stem2id[stem]
-        pairs = self.index[stem_id]
+        pairs = self.query(word)
         objects = self.objects
         for type_, id_ in pairs:
             yield objects[type_][id_]
@@ -1,6 +1,7 @@
 import datetime
 import lxml.html
-from billy.utils.fulltext import text_after_line_numbers, pdfdata_to_text
+from billy.utils.fulltext import text_after_line_numbers
+from openstates.utils.pdf import pdfdata_to_text
 from .bills import AZBillScraper
 from .legislators import AZLegislatorScraper
 from .committees import AZCommitteeScraper
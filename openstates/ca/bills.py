@@ -5,14 +5,38 @@ import itertools
 
 from lxml import etree, html
 import pytz
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, subqueryload
+from sqlalchemy import create_engine, func, or_
 
 from billy.core import settings
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from .models import CABill
+from .models import (CABill, CABillAction, CABillVersion, CABillVersionAuthor,
+                     CAVoteSummary, CAVoteDetail, TRANS_UPDATE_COLUMNS)
 from .actions import CACategorizer
+from openstates.utils import CachedCategorizer, DiskCache, env_flag
+
+
+# In incremental mode only bills whose rows changed since the last
+# successful scrape of the same session and chamber are emitted.
+CA_INCREMENTAL = getattr(settings, 'CA_INCREMENTAL', False)
+CA_INCREMENTAL = env_flag('CA_INCREMENTAL', CA_INCREMENTAL)
+
+# Bills are loaded this many at a time, with every relation the scrape
+# touches fetched up front in one query per relation rather than lazily
+# per bill.
+BILL_CHUNK_SIZE = 200
+
+BILL_LOAD_OPTIONS = (
+    subqueryload(CABill.actions),
+    # Every version's text is needed for titles, so bill_xml is loaded
+    # with the versions instead of one deferred SELECT per version.
+    subqueryload(CABill.versions).undefer('bill_xml'),
+    subqueryload(CABill.versions).subqueryload(CABillVersion.authors),
+    subqueryload(CABill.votes).subqueryload(CAVoteSummary.votes),
+    subqueryload(CABill.votes).joinedload(CAVoteSummary.motion),
+    subqueryload(CABill.votes).joinedload(CAVoteSummary.location),
+)
 
 SPONSOR_TYPES = {'LEAD_AUTHOR': 'primary',
                  'COAUTHOR': 'cosponsor',
@@ -253,7 +277,7 @@ def get_committee_name_regex():
 class CABillScraper(BillScraper):
     jurisdiction = 'ca'
 
-    categorizer = CACategorizer()
+    categorizer = CachedCategorizer(CACategorizer())
 
     _tz = pytz.timezone('US/Pacific')
 
@@ -316,11 +340,70 @@ class CABillScraper(BillScraper):
                 }
             }
 
+        if CA_INCREMENTAL:
+            watermarks = DiskCache('ca_watermarks')
+            key = ('scrape', session, chamber)
+            # Taken before scraping, so rows written during the scrape
+            # are picked up next time rather than skipped.
+            current = self.table_watermarks()
+            since = watermarks.get(key)
+        else:
+            since = None
+
         for abbr, type_ in bill_types[chamber].items():
-            self.scrape_bill_type(chamber, session, type_, abbr)
+            self.scrape_bill_type(chamber, session, type_, abbr, since=since)
+
+        if CA_INCREMENTAL:
+            watermarks.set(key, current)
+            watermarks.save()
+
+    def table_watermarks(self):
+        '''The latest trans_update in each table the bill scrape reads.
+        '''
+        return dict((table, self.session.query(func.max(column)).scalar())
+                    for table, column in TRANS_UPDATE_COLUMNS.items())
+
+    def changed_since(self, since):
+        '''A filter matching bills whose own row or any child row changed
+        after the watermarks in `since`, or None if every bill should be
+        scraped.
+        '''
+        if not since or None in since.values():
+            return None
+
+        version_changed = or_(
+            CABillVersion.trans_update > since['bill_version_tbl'],
+            CABillVersion.authors.any(CABillVersionAuthor.trans_update >
+                                      since['bill_version_authors_tbl']))
+        return or_(
+            CABill.trans_update > since['bill_tbl'],
+            CABill.actions.any(
+                CABillAction.trans_update_dt > since['bill_history_tbl']),
+            CABill.versions.any(version_changed),
+            CABill.votes.any(
+                CAVoteSummary.trans_update > since['bill_summary_vote_tbl']),
+            CABill.detail_votes.any(
+                CAVoteDetail.trans_update > since['bill_detail_vote_tbl']))
+
+    def iter_bills(self, query, chunk_size=BILL_CHUNK_SIZE):
+        '''Yield the bills matched by `query` with their children eagerly
+        loaded, a chunk at a time. Each chunk is expunged from the session
+        once it has been consumed, so memory stays flat over a session.
+        '''
+        bill_ids = [bill_id for (bill_id,) in
+                    query.with_entities(CABill.bill_id)]
+
+        for start in xrange(0, len(bill_ids), chunk_size):
+            chunk = bill_ids[start:start + chunk_size]
+            bills = self.session.query(CABill).options(
+                *BILL_LOAD_OPTIONS).filter(
+                CABill.bill_id.in_(chunk)).order_by(CABill.bill_id)
+            for bill in bills.all():
+                yield bill
+            self.session.expunge_all()
 
     def scrape_bill_type(self, chamber, session, bill_type, type_abbr,
-            committee_abbr_regex=get_committee_name_regex()):
+            committee_abbr_regex=get_committee_name_regex(), since=None):
 
         if chamber == 'upper':
             chamber_name = 'SENATE'
@@ -331,7 +414,11 @@ class CABillScraper(BillScraper):
             session_year=session).filter_by(
             measure_type=type_abbr)
 
-        for bill in bills:
+        changed = self.changed_since(since)
+        if changed is not None:
+            bills = bills.filter(changed)
+
+        for bill in self.iter_bills(bills):
             bill_session = session
             if bill.session_num != '0':
                 bill_session += ' Special Session %s' % bill.session_num
@@ -362,11 +449,8 @@ class CABillScraper(BillScraper):
             # Get digest test (aka "summary") from latest version.
             if bill.versions:
                 version = bill.versions[-1]
-                nsmap = version.xml.nsmap
-                xpath = '//caml:DigestText/xhtml:p'
-                els = version.xml.xpath(xpath, namespaces=nsmap)
                 chunks = []
-                for el in els:
+                for el in version.digest:
                     t = etree_text_content(el)
                     t = re.sub(r'\s+', ' ', t)
                     t = re.sub(r'\)(\S)', lambda m: ') %s' % m.group(1), t)
@@ -610,7 +694,6 @@ class CABillScraper(BillScraper):
                 fsbill.add_vote(fsvote)
 
             self.save_bill(fsbill)
-            self.session.expire_all()
 
 def etree_text_content(el):
     el = html.fromstring(etree.tostring(el))
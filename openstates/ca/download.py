@@ -5,6 +5,10 @@ The workflow is:
  - Drop & recreate the local capublic database.
  - Inspect the FTP site with regex and determine which files have been updated, if any.
  - For each such file, unzip it & call import.
+
+With --incremental (or CA_INCREMENTAL set), an existing capublic is kept
+and only files whose listing date is newer than the one last applied are
+imported; a newer weekly dump replaces just its own session's rows.
 '''
 import sys
 import os
@@ -14,16 +18,20 @@ import os.path
 import zipfile
 import subprocess
 import logging
+import time
 import urllib
+import itertools
 from datetime import datetime
 from os.path import join, split
 from functools import partial
 from collections import namedtuple
+from multiprocessing.pool import ThreadPool
 
 import MySQLdb
 import _mysql_exceptions
 
 from billy.core import settings
+from openstates.utils import DiskCache, env_flag
 
 
 MYSQL_USER = getattr(settings, 'MYSQL_USER', 'root')
@@ -32,6 +40,19 @@ MYSQL_USER = os.environ.get('MYSQL_USER', MYSQL_USER)
 MYSQL_PASSWORD = getattr(settings, 'MYSQL_PASSWORD', '')
 MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', MYSQL_PASSWORD)
 
+# Rows per multi-row REPLACE when loading BILL_VERSION_TBL, and the number
+# of threads reading the companion bill_xml files.
+BILL_VERSION_BATCH_SIZE = getattr(settings, 'CA_BILL_VERSION_BATCH_SIZE', 200)
+BILL_VERSION_BATCH_SIZE = int(os.environ.get('CA_BILL_VERSION_BATCH_SIZE',
+                                             BILL_VERSION_BATCH_SIZE))
+
+BILL_VERSION_READERS = getattr(settings, 'CA_BILL_VERSION_READERS', 8)
+BILL_VERSION_READERS = int(os.environ.get('CA_BILL_VERSION_READERS',
+                                          BILL_VERSION_READERS))
+
+CA_INCREMENTAL = getattr(settings, 'CA_INCREMENTAL', False)
+CA_INCREMENTAL = env_flag('CA_INCREMENTAL', CA_INCREMENTAL)
+
 BASE_URL = 'ftp://www.leginfo.ca.gov/pub/bill/'
 
 
@@ -78,16 +99,37 @@ def db_drop():
     logger.info('...done.')
 
 
+def db_exists():
+    '''Whether the capublic database has already been created.'''
+    try:
+        connection = MySQLdb.connect(user=MYSQL_USER, passwd=MYSQL_PASSWORD,
+                                     db='capublic')
+    except _mysql_exceptions.OperationalError:
+        return False
+    connection.close()
+    return True
+
+
 
 # ---------------------------------------------------------------------------
 # Functions for updating the data.
-def load_bill_versions(connection):
+def load_bill_versions(connection, batch_size=None, readers=None):
     '''
-    Given a data folder, read its BILL_VERSION_TBL.dat file in python,
-    construct individual REPLACE statements and execute them one at
-    a time. This method is slower that letting mysql do the import,
-    but doesn't fail mysteriously.
+    Given a data folder, read its BILL_VERSION_TBL.dat file in python
+    and load it with batched, multi-row REPLACE statements. This is
+    slower than letting mysql do the import (LOAD DATA chokes on the
+    bill_xml contents), but doesn't fail mysteriously.
+
+    The companion xml files are read by a pool of `readers` threads.
+    Batches hold at most `batch_size` rows and are also capped at half
+    the server's max_allowed_packet, since a batch of large bills can
+    otherwise exceed it and get the connection dropped.
     '''
+    if batch_size is None:
+        batch_size = BILL_VERSION_BATCH_SIZE
+    if readers is None:
+        readers = BILL_VERSION_READERS
+
     DatRow = namedtuple('DatRow', [
                       'bill_version_id', 'bill_id', 'version_num',
                       'bill_version_action_date', 'bill_version_action',
@@ -111,6 +153,18 @@ def load_bill_versions(connection):
                 res.append(cell)
         return DatRow(*res)
 
+    def read_row(row):
+        '''Clean a .dat row and swap in the contents of its xml file.
+        '''
+        # The files are supposedly already in utf-8, but with
+        # copious bogus characters.
+        row = clean_text(row.decode('utf-8')).encode('utf-8')
+        row = dat_row_2_tuple(row)
+        with open(row.bill_xml) as f:
+            text = f.read().decode('utf-8')
+            text = clean_text(text).encode('utf-8')
+        return tuple(row._replace(bill_xml=text))
+
     sql = '''
         REPLACE INTO capublic.bill_version_tbl (
             BILL_VERSION_ID,
@@ -137,17 +191,45 @@ def load_bill_versions(connection):
     sql = sql % ', '.join(['%s'] * 18)
 
     cursor = connection.cursor()
-    with open('BILL_VERSION_TBL.dat') as f:
-        for row in f:
-            # The files are supposedly already in utf-8, but with
-            # copious bogus characters.
-            row = clean_text(row.decode('utf-8')).encode('utf-8')
-            row = dat_row_2_tuple(row)
-            with open(row.bill_xml) as f:
-                text = f.read().decode('utf-8')
-                text = clean_text(text).encode('utf-8')
-                row = row._replace(bill_xml=text)
-                cursor.execute(sql, tuple(row))
+    cursor.execute('SELECT @@max_allowed_packet')
+    max_bytes = cursor.fetchone()[0] // 2
+
+    batch = []
+    batch_bytes = 0
+    count = 0
+    started = time.time()
+
+    def flush():
+        cursor.executemany(sql, batch)
+        elapsed = time.time() - started
+        logger.info('%d bill versions loaded (%.1f rows/sec)' % (
+            count, count / elapsed if elapsed else 0))
+
+    pool = ThreadPool(readers)
+    try:
+        with open('BILL_VERSION_TBL.dat') as f:
+            # Hand the readers a window of lines at a time, so parsed
+            # bill_xml can't pile up when the inserts fall behind.
+            window = batch_size * readers
+            while True:
+                lines = list(itertools.islice(f, window))
+                if not lines:
+                    break
+                for row in pool.imap(read_row, lines, chunksize=batch_size):
+                    row_bytes = sum(len(cell) for cell in row if cell)
+                    if batch and (len(batch) >= batch_size or
+                                  batch_bytes + row_bytes > max_bytes):
+                        flush()
+                        batch = []
+                        batch_bytes = 0
+                    batch.append(row)
+                    batch_bytes += row_bytes
+                    count += 1
+        if batch:
+            flush()
+    finally:
+        pool.close()
+        pool.join()
 
     cursor.close()
 
@@ -304,33 +386,72 @@ def get_zip(filename):
     _check_call('rm', '-rf', filename)
     return dirname
 
-def get_current_year(contents):
+def get_current_year(contents, watermarks=None):
+    '''Import the newest full-year dump and any daily files newer than
+    it. If `watermarks` is given, files whose listing date hasn't moved
+    since they were last applied are skipped, and the applied dates are
+    recorded.
+    '''
     newest_file = '2000'
     newest_file_date = datetime(2000, 1, 1)
     files_to_get = []
     dirnames = []
 
+    def applied(filename):
+        if watermarks is None:
+            return False
+        mark = watermarks.get(('file', filename))
+        return mark is not None and mark >= contents[filename]
+
     # get file for latest year
     for filename, date in contents.items():
         date_part = filename.replace('pubinfo_', '').replace('.zip', '')
         if date_part.startswith('20') and filename > newest_file:
             newest_file = filename
             newest_file_date = date
-    files_to_get.append(newest_file)
+    new_weekly = not applied(newest_file)
+    if new_weekly:
+        files_to_get.append(newest_file)
 
     # get files for days since last update
     days = ('pubinfo_Mon.zip', 'pubinfo_Tue.zip', 'pubinfo_Wed.zip', 'pubinfo_Thu.zip',
             'pubinfo_Fri.zip', 'pubinfo_Sat.zip')
     for dayfile in days:
-        if contents[dayfile] > newest_file_date:
+        # Dailies are replayed on top of a freshly loaded weekly dump.
+        if contents[dayfile] > newest_file_date and (
+                new_weekly or not applied(dayfile)):
             files_to_get.append(dayfile)
 
+    if not files_to_get:
+        logger.info('capublic is up to date.')
+
     for file in files_to_get:
+        if watermarks is not None and file == newest_file:
+            # A new weekly dump supersedes everything loaded for its
+            # session so far.
+            year = file.replace('pubinfo_', '').replace('.zip', '')
+            delete_session(year)
         dirname = get_zip(file)
         load(dirname)
+        if watermarks is not None:
+            watermarks.set(('file', file), contents[file])
+            watermarks.save()
+
+
+def update(incremental=False):
+    contents = get_contents()
+    watermarks = DiskCache('ca_watermarks')
+    if incremental and db_exists():
+        get_current_year(contents, watermarks)
+        return
 
-if __name__ == '__main__':
     db_drop()
     db_create()
-    contents = get_contents()
-    get_current_year(contents)
+    # Everything is reloaded, so forget which files were applied.
+    for filename in contents:
+        watermarks.delete(('file', filename))
+    get_current_year(contents, watermarks)
+
+
+if __name__ == '__main__':
+    update(incremental=CA_INCREMENTAL or '--incremental' in sys.argv[1:])
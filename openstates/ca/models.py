@@ -1,14 +1,44 @@
 from sqlalchemy import (Table, Column, Integer, String, ForeignKey,
                         DateTime, Numeric, desc, UnicodeText)
 from sqlalchemy.sql import and_
-from sqlalchemy.orm import backref, relation
+from sqlalchemy.orm import backref, relation, deferred
 from sqlalchemy.ext.declarative import declarative_base
 
+from io import BytesIO
+
 from lxml import etree
 
 Base = declarative_base()
 
 
+def extract_elements(xml, names):
+    '''Pull the first element with each local name in `names` out of an
+    xml document without building the whole tree. Parsing stops as soon
+    as all of them have been found, and everything outside them is
+    discarded as it is read. Returns a dict of local name to element.
+    '''
+    names = set(names)
+    found = {}
+    capturing = {}
+    events = etree.iterparse(BytesIO(xml), events=('start', 'end'),
+                             recover=True)
+    for event, el in events:
+        if not isinstance(el.tag, basestring):
+            continue
+        name = etree.QName(el).localname
+        if event == 'start':
+            if name in names and name not in found \
+                    and name not in capturing:
+                capturing[name] = el
+        elif capturing.get(name) is el:
+            found[name] = capturing.pop(name)
+            if len(found) == len(names):
+                break
+        elif not capturing:
+            el.clear()
+    return found
+
+
 class CABill(Base):
     __tablename__ = "bill_tbl"
 
@@ -62,7 +92,8 @@ class CABillVersion(Base):
     substantive_changes = Column(String(3))
     urgency = Column(String(3))
     taxlevy = Column(String(3))
-    bill_xml = Column(UnicodeText)
+    # The full bill text; only loaded when something asks for it.
+    bill_xml = deferred(Column(UnicodeText))
     active_flg = Column(String(1))
     trans_uid = Column(String(30))
     trans_update = Column(DateTime)
@@ -74,15 +105,37 @@ class CABillVersion(Base):
                                          etree.XMLParser(recover=True))
         return self._xml
 
+    @property
+    def parts(self):
+        '''The Title, Subject and DigestText elements, extracted without
+        parsing the rest of the bill.
+        '''
+        if not '_parts' in self.__dict__:
+            self._parts = extract_elements(self.bill_xml.encode('utf-8'),
+                                           ('Title', 'Subject', 'DigestText'))
+        return self._parts
+
+    def _part_text(self, name):
+        el = self.parts.get(name)
+        if el is None:
+            return ''
+        return (el.xpath('string()') or '').strip()
+
     @property
     def title(self):
-        text = self.xml.xpath("string(//*[local-name() = 'Title'])") or ''
-        return text.strip()
+        return self._part_text('Title')
 
     @property
     def short_title(self):
-        text = self.xml.xpath("string(//*[local-name() = 'Subject'])") or ''
-        return text.strip()
+        return self._part_text('Subject')
+
+    @property
+    def digest(self):
+        '''The paragraphs of the bill's digest (aka "summary").'''
+        el = self.parts.get('DigestText')
+        if el is None:
+            return []
+        return el.xpath("./*[local-name() = 'p']")
 
 
 class CABillVersionAuthor(Base):
@@ -265,3 +318,15 @@ class CACommitteeHearing(Base):
     trans_update_date = Column(DateTime, primary_key=True)
 
     bill = relation(CABill, backref=backref('committee_hearings'))
+
+
+# The column each table uses to record when a row last changed; used to
+# find bills touched since a previous incremental scrape.
+TRANS_UPDATE_COLUMNS = {
+    'bill_tbl': CABill.trans_update,
+    'bill_history_tbl': CABillAction.trans_update_dt,
+    'bill_version_tbl': CABillVersion.trans_update,
+    'bill_version_authors_tbl': CABillVersionAuthor.trans_update,
+    'bill_summary_vote_tbl': CAVoteSummary.trans_update,
+    'bill_detail_vote_tbl': CAVoteDetail.trans_update,
+}
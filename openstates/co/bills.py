@@ -8,6 +8,7 @@ from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 
 from .actions import Categorizer
+from openstates.utils import CachedCategorizer
 
 
 CO_URL_BASE = "http://www.leg.state.co.us"
@@ -22,7 +23,7 @@ class COBillScraper(BillScraper):
     """
 
     jurisdiction = 'co'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
 
     def get_bill_folder(self, session, chamber):
         """
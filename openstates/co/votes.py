@@ -1,6 +1,6 @@
 from openstates.utils import LXMLMixin
 from billy.scrape.votes import VoteScraper, Vote
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 import datetime
 import subprocess
 import lxml
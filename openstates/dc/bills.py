@@ -3,48 +3,72 @@ import datetime
 import lxml.html
 import json
 
+import os
+import copy
+import functools
+
 import scrapelib
 
+from billy.core import settings
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 
+from .utils import decode_json, imap_bounded, search_pages
+
+# Search pages and bill details are fetched this many at a time.
+DC_MAX_IN_FLIGHT = getattr(settings, 'DC_MAX_IN_FLIGHT', 4)
+DC_MAX_IN_FLIGHT = int(os.environ.get('DC_MAX_IN_FLIGHT', DC_MAX_IN_FLIGHT))
+
+# LIMS seems to give 10 results a page no matter what we ask for.
+PER_PAGE = 10
+
+HEADERS = {"Content-Type":"application/json"}
+SEARCH_URL = "http://lims.dccouncil.us/_layouts/15/uploader/AdminProxy.aspx/GetPublicAdvancedSearch"
+BILL_URL = "http://lims.dccouncil.us/_layouts/15/uploader/AdminProxy.aspx/GetPublicData"
+
 
 class DCBillScraper(BillScraper):
     jurisdiction = 'dc'
 
     def decode_json(self,stringy_json):
         #the "json" they send is recursively string-encoded.
-        if type(stringy_json) == dict:
-            for key in stringy_json:
-                stringy_json[key] = self.decode_json(stringy_json[key])
-
-        elif type(stringy_json) == list:
-            for i in range(len(stringy_json)):
-                stringy_json[i] = self.decode_json(stringy_json[i])
-
-        elif type(stringy_json) in (str,unicode):
-            if len(stringy_json) > 0 and stringy_json[0] in ["[","{",u"[",u"{"]:
-                return self.decode_json(json.loads(stringy_json))
-        return stringy_json
-
+        return decode_json(stringy_json)
 
+    def search_page(self, params, start):
+        params = copy.deepcopy(params)
+        params["request"]["iDisplayStart"] = start
+        response = self.post(SEARCH_URL, headers=HEADERS,
+                             data=json.dumps(params))
+        #the response is a terrible string-of-nested-json-strings. Yuck.
+        return self.decode_json(response.json()["d"])
+
+    def bill_info(self, bill_id):
+        bill_params = {"legislationId":bill_id}
+        bill_info = self.post(BILL_URL,headers=HEADERS,data=json.dumps(bill_params))
+        return bill_id, self.decode_json(bill_info.json()["d"])["data"]
+
+    def bill_infos(self, params):
+        """ (bill_id, bill_info) for every bill in the search, with pages
+        and bill details fetched DC_MAX_IN_FLIGHT at a time """
+        pages = search_pages(functools.partial(self.search_page, params),
+                             PER_PAGE, DC_MAX_IN_FLIGHT)
+        #the search is read here, not by the pool, so its errors aren't
+        #lost in the pool's task handler
+        bill_ids = [bill["Title"] for page in pages for bill in page
+                    #AG* are actually agendas, skip them
+                    if not bill["Title"].startswith("AG")]
+        return imap_bounded(self.bill_info, bill_ids, DC_MAX_IN_FLIGHT)
 
     def scrape(self, session, chambers):
         #get member id matching for vote parsing
         member_ids = self.get_member_ids()[session]
-        per_page = 10 #seems like it gives me 10 no matter what.
-        start_record = 0
-
-        headers = {"Content-Type":"application/json"}
-        url = "http://lims.dccouncil.us/_layouts/15/uploader/AdminProxy.aspx/GetPublicAdvancedSearch"
-        bill_url = "http://lims.dccouncil.us/_layouts/15/uploader/AdminProxy.aspx/GetPublicData"
         params = {
             "request": {
                 "sEcho":2,
                 "iColumns":4,
                 "sColumns":"",
                 "iDisplayStart":0,
-                "iDisplayLength":per_page,
+                "iDisplayLength":PER_PAGE,
                 "mDataProp_0":"ShortTitle",
                 "mDataProp_1":"Title",
                 "mDataProp_2":"LegislationCategories",
@@ -76,251 +100,228 @@ class DCBillScraper(BillScraper):
                 "IncludeDocumentSearch":"false"
             }
         }
-        param_json = json.dumps(params)
-        response = self.post(url,headers=headers,data=param_json)
-        #the response is a terrible string-of-nested-json-strings. Yuck.
-        response = self.decode_json(response.json()["d"])
-        data = response["aaData"]
-        
         global bill_versions
 
-        while len(data) > 0:
-
-            for bill in data:
-                
-                bill_versions = [] #sometimes they're in there more than once, so we'll keep track
-
-                bill_id = bill["Title"]
-                if bill_id.startswith("AG"):
-                    #actually an agenda, skip
-                    continue
-                bill_params = {"legislationId":bill_id}
-                bill_info = self.post(bill_url,headers=headers,data=json.dumps(bill_params))
-                bill_info = self.decode_json(bill_info.json()["d"])["data"]
-                bill_source_url = "http://lims.dccouncil.us/Legislation/"+bill_id
-
-
-                legislation_info = bill_info["Legislation"][0]
-                title = legislation_info["ShortTitle"]
-                
-                
-                
-                if bill_id.startswith("R") or bill_id.startswith("CER"):
-                    bill_type = "resolution"
-                else:
-                    bill_type = "bill"
-                
-                #dc has no chambers. calling it all upper
-                bill = Bill(session,"upper", bill_id, title, type=bill_type)
-
-                #sponsors and cosponsors
-                if "Introducer" in legislation_info:
-                    introducers = legislation_info["Introducer"]
-                    intro_date = self.date_format(legislation_info["IntroductionDate"])
+        for bill_id, bill_info in self.bill_infos(params):
+
+            bill_versions = [] #sometimes they're in there more than once, so we'll keep track
+
+            bill_source_url = "http://lims.dccouncil.us/Legislation/"+bill_id
+
+
+            legislation_info = bill_info["Legislation"][0]
+            title = legislation_info["ShortTitle"]
+            
+            
+            
+            if bill_id.startswith("R") or bill_id.startswith("CER"):
+                bill_type = "resolution"
+            else:
+                bill_type = "bill"
+            
+            #dc has no chambers. calling it all upper
+            bill = Bill(session,"upper", bill_id, title, type=bill_type)
+
+            #sponsors and cosponsors
+            if "Introducer" in legislation_info:
+                introducers = legislation_info["Introducer"]
+                intro_date = self.date_format(legislation_info["IntroductionDate"])
+                bill.add_action("upper",
+                                "Introduced",
+                                intro_date,
+                                type="bill:introduced")
+            else:
+                #sometimes there are introducers, sometimes not.
+                # Set Introducers to empty array to avoid downstream breakage, but log bills without introducers
+                self.logger.warning("No Introducer: {0} {1}: {2}".format(bill['chamber'], bill['session'], bill['bill_id']))
+                introducers = []
+
+            try:
+                #sometimes there are cosponsors, sometimes not.
+                cosponsors = legislation_info["CoSponsor"]
+            except KeyError:
+                cosponsors = []
+
+            for i in introducers:
+                sponsor_name = i["Name"]
+                #they messed up Phil Mendelson's name
+                if sponsor_name == "Phil Pmendelson":
+                    sponsor_name = "Phil Mendelson"
+                bill.add_sponsor(name=sponsor_name,type="primary")
+            for s in cosponsors:
+                sponsor_name = s["Name"]
+                if sponsor_name == "Phil Pmendelson":
+                    sponsor_name = "Phil Mendelson"
+                bill.add_sponsor(name=sponsor_name,type="cosponsor")
+
+
+            #if it's become law, add the law number as an alternate title
+            if "LawNumber" in legislation_info:
+                law_num = legislation_info["LawNumber"]
+                if law_num:
+                    bill.add_title(law_num)
+
+            #also sometimes it's got an act number
+            if "ActNumber" in legislation_info:
+                act_num = legislation_info["ActNumber"]
+                if act_num:
+                    bill.add_title(act_num)
+
+            #sometimes AdditionalInformation has a previous bill name
+            if "AdditionalInformation" in legislation_info:
+                add_info = legislation_info["AdditionalInformation"]
+                if "previously" in add_info.lower():
+                    prev_title = add_info.lower().replace("previously","").strip().replace(" ","")
+                    bill.add_title(prev_title.upper())
+                elif add_info:
+                    bill["additional_information"] = add_info
+
+            if "WithDrawnDate" in legislation_info:
+                withdrawn_date = self.date_format(legislation_info["WithDrawnDate"])
+                withdrawn_by = legislation_info["WithdrawnBy"][0]["Name"].strip()
+                if withdrawn_by == "the Mayor":
+
+                    bill.add_action("executive",
+                                "withdrawn",
+                                withdrawn_date,
+                                "bill:withdrawn")
+
+                elif "committee" in withdrawn_by.lower():
                     bill.add_action("upper",
-                                    "Introduced",
-                                    intro_date,
-                                    type="bill:introduced")
+                                "withdrawn",
+                                withdrawn_date,
+                                "bill:withdrawn",
+                                committees=withdrawn_by)
                 else:
-                    #sometimes there are introducers, sometimes not.
-                    # Set Introducers to empty array to avoid downstream breakage, but log bills without introducers
-                    self.logger.warning("No Introducer: {0} {1}: {2}".format(bill['chamber'], bill['session'], bill['bill_id']))
-                    introducers = []
-
-                try:
-                    #sometimes there are cosponsors, sometimes not.
-                    cosponsors = legislation_info["CoSponsor"]
-                except KeyError:
-                    cosponsors = []
-
-                for i in introducers:
-                    sponsor_name = i["Name"]
-                    #they messed up Phil Mendelson's name
-                    if sponsor_name == "Phil Pmendelson":
-                        sponsor_name = "Phil Mendelson"
-                    bill.add_sponsor(name=sponsor_name,type="primary")
-                for s in cosponsors:
-                    sponsor_name = s["Name"]
-                    if sponsor_name == "Phil Pmendelson":
-                        sponsor_name = "Phil Mendelson"
-                    bill.add_sponsor(name=sponsor_name,type="cosponsor")
-
-
-                #if it's become law, add the law number as an alternate title
-                if "LawNumber" in legislation_info:
-                    law_num = legislation_info["LawNumber"]
-                    if law_num:
-                        bill.add_title(law_num)
-
-                #also sometimes it's got an act number
-                if "ActNumber" in legislation_info:
-                    act_num = legislation_info["ActNumber"]
-                    if act_num:
-                        bill.add_title(act_num)
-
-                #sometimes AdditionalInformation has a previous bill name
-                if "AdditionalInformation" in legislation_info:
-                    add_info = legislation_info["AdditionalInformation"]
-                    if "previously" in add_info.lower():
-                        prev_title = add_info.lower().replace("previously","").strip().replace(" ","")
-                        bill.add_title(prev_title.upper())
-                    elif add_info:
-                        bill["additional_information"] = add_info
-
-                if "WithDrawnDate" in legislation_info:
-                    withdrawn_date = self.date_format(legislation_info["WithDrawnDate"])
-                    withdrawn_by = legislation_info["WithdrawnBy"][0]["Name"].strip()
-                    if withdrawn_by == "the Mayor":
-
-                        bill.add_action("executive",
-                                    "withdrawn",
-                                    withdrawn_date,
-                                    "bill:withdrawn")
-
-                    elif "committee" in withdrawn_by.lower():
-                        bill.add_action("upper",
-                                    "withdrawn",
-                                    withdrawn_date,
-                                    "bill:withdrawn",
-                                    committees=withdrawn_by)
-                    else:
-                        bill.add_action("upper",
-                                    "withdrawn",
-                                    withdrawn_date,
-                                    "bill:withdrawn",
-                                    legislators=withdrawn_by)
+                    bill.add_action("upper",
+                                "withdrawn",
+                                withdrawn_date,
+                                "bill:withdrawn",
+                                legislators=withdrawn_by)
 
 
-                #deal with actions involving the mayor
-                mayor = bill_info["MayorReview"]
-                if mayor != []:
-                    mayor = mayor[0]
+            #deal with actions involving the mayor
+            mayor = bill_info["MayorReview"]
+            if mayor != []:
+                mayor = mayor[0]
 
-                    #in dc, mayor == governor because openstates schema
-                    if "TransmittedDate" in mayor:
-                        transmitted_date = self.date_format(mayor["TransmittedDate"])
+                #in dc, mayor == governor because openstates schema
+                if "TransmittedDate" in mayor:
+                    transmitted_date = self.date_format(mayor["TransmittedDate"])
 
-                        bill.add_action("executive",
-                                    "transmitted to mayor",
-                                    transmitted_date,
-                                    type = "governor:received")
+                    bill.add_action("executive",
+                                "transmitted to mayor",
+                                transmitted_date,
+                                type = "governor:received")
 
-                    if 'SignedDate' in mayor:
-                        signed_date = self.date_format(mayor["SignedDate"])
+                if 'SignedDate' in mayor:
+                    signed_date = self.date_format(mayor["SignedDate"])
 
-                        bill.add_action("executive",
-                                        "signed",
-                                        signed_date,
-                                        type="governor:signed")
+                    bill.add_action("executive",
+                                    "signed",
+                                    signed_date,
+                                    type="governor:signed")
 
 
-                    elif 'ReturnedDate' in mayor: #if returned but not signed, it was vetoed
-                        veto_date = self.date_format(mayor["ReturnedDate"])
+                elif 'ReturnedDate' in mayor: #if returned but not signed, it was vetoed
+                    veto_date = self.date_format(mayor["ReturnedDate"])
 
-                        bill.add_action("executive",
-                                        "vetoed",
-                                        veto_date,
-                                        type="governor:vetoed")
+                    bill.add_action("executive",
+                                    "vetoed",
+                                    veto_date,
+                                    type="governor:vetoed")
 
-                        if 'EnactedDate' in mayor: #if it was returned and enacted but not signed, there was a veto override
-                            override_date = self.date_format(mayor["EnactedDate"])
+                    if 'EnactedDate' in mayor: #if it was returned and enacted but not signed, there was a veto override
+                        override_date = self.date_format(mayor["EnactedDate"])
 
-                            bill.add_action("upper",
-                                        "veto override",
-                                        override_date,
-                                        type="bill:veto_override:passed")
+                        bill.add_action("upper",
+                                    "veto override",
+                                    override_date,
+                                    type="bill:veto_override:passed")
 
-                    if 'AttachmentPath' in mayor:
-                        #documents relating to the mayor's review
-                        self.add_documents(mayor["AttachmentPath"],bill)
+                if 'AttachmentPath' in mayor:
+                    #documents relating to the mayor's review
+                    self.add_documents(mayor["AttachmentPath"],bill)
 
-                congress = bill_info["CongressReview"]
-                if len(congress) > 0:
-                    congress = congress[0]
-                    if "TransmittedDate" in congress:
-                        transmitted_date = self.date_format(congress["TransmittedDate"])
+            congress = bill_info["CongressReview"]
+            if len(congress) > 0:
+                congress = congress[0]
+                if "TransmittedDate" in congress:
+                    transmitted_date = self.date_format(congress["TransmittedDate"])
 
-                        bill.add_action("other",
-                                    "Transmitted to Congress for review",
-                                    transmitted_date)
+                    bill.add_action("other",
+                                "Transmitted to Congress for review",
+                                transmitted_date)
 
 
 
 
-                #deal with committee actions
-                if "DateRead" in legislation_info:
-                    date = legislation_info["DateRead"]
-                elif "IntroductionDate" in legislation_info:
-                    date = legislation_info["IntroductionDate"]
-                else:
-                    self.logger.warning("Crap, we can't find anything that looks like an action date. Skipping")
-                    continue
-                date = self.date_format(date)
-                if "CommitteeReferral" in legislation_info:
-                    committees = []
-                    for committee in legislation_info["CommitteeReferral"]:
-                        if committee["Name"].lower() == "retained by the council":
-                            committees = []
-                            break
-                        else:
-                            committees.append(committee["Name"])
-                    if committees != []:
-                        bill.add_action("upper",
-                                    "referred to committee",
-                                    date,
-                                    committees=committees,
-                                    type="committee:referred")
-
-                if "CommitteeReferralComments" in legislation_info:
-                    committees = []
-                    for committee in legislation_info["CommitteeReferralComments"]:
+            #deal with committee actions
+            if "DateRead" in legislation_info:
+                date = legislation_info["DateRead"]
+            elif "IntroductionDate" in legislation_info:
+                date = legislation_info["IntroductionDate"]
+            else:
+                self.logger.warning("Crap, we can't find anything that looks like an action date. Skipping")
+                continue
+            date = self.date_format(date)
+            if "CommitteeReferral" in legislation_info:
+                committees = []
+                for committee in legislation_info["CommitteeReferral"]:
+                    if committee["Name"].lower() == "retained by the council":
+                        committees = []
+                        break
+                    else:
                         committees.append(committee["Name"])
+                if committees != []:
                     bill.add_action("upper",
-                                    "comments from committee",
-                                    date,
-                                    committees=committees,
-                                    type="other")
-
-                #deal with random docs floating around
-                docs = bill_info["OtherDocuments"]
-                for d in docs:
-                    if "AttachmentPath" in d:
-                        self.add_documents(d["AttachmentPath"],bill)
-                    else:
-                        self.logger.warning("Document path missing from 'Other Documents'")
+                                "referred to committee",
+                                date,
+                                committees=committees,
+                                type="committee:referred")
+
+            if "CommitteeReferralComments" in legislation_info:
+                committees = []
+                for committee in legislation_info["CommitteeReferralComments"]:
+                    committees.append(committee["Name"])
+                bill.add_action("upper",
+                                "comments from committee",
+                                date,
+                                committees=committees,
+                                type="other")
+
+            #deal with random docs floating around
+            docs = bill_info["OtherDocuments"]
+            for d in docs:
+                if "AttachmentPath" in d:
+                    self.add_documents(d["AttachmentPath"],bill)
+                else:
+                    self.logger.warning("Document path missing from 'Other Documents'")
 
-                if "MemoLink" in legislation_info:
-                    self.add_documents(legislation_info["MemoLink"],bill)
+            if "MemoLink" in legislation_info:
+                self.add_documents(legislation_info["MemoLink"],bill)
 
-                if "AttachmentPath" in legislation_info:
-                    self.add_documents(legislation_info["AttachmentPath"],bill)
+            if "AttachmentPath" in legislation_info:
+                self.add_documents(legislation_info["AttachmentPath"],bill)
 
 
-                #full council votes
-                votes = bill_info["VotingSummary"]
-                for vote in votes:
-                    self.process_vote(vote, bill, member_ids)
-     
+            #full council votes
+            votes = bill_info["VotingSummary"]
+            for vote in votes:
+                self.process_vote(vote, bill, member_ids)
+ 
 
-                #deal with committee votes
-                if "CommitteeMarkup" in bill_info:
-                    committee_info = bill_info["CommitteeMarkup"]
-                    if len(committee_info) > 0:
-                        for committee_action in committee_info:
-                            self.process_committee_vote(committee_action,bill)
-                        if "AttachmentPath" in committee_info:
-                            self.add_documents(vote["AttachmentPath"],bill,is_version)
+            #deal with committee votes
+            if "CommitteeMarkup" in bill_info:
+                committee_info = bill_info["CommitteeMarkup"]
+                if len(committee_info) > 0:
+                    for committee_action in committee_info:
+                        self.process_committee_vote(committee_action,bill)
+                    if "AttachmentPath" in committee_info:
+                        self.add_documents(vote["AttachmentPath"],bill,is_version)
 
-                bill.add_source(bill_source_url)
-                self.save_bill(bill)
-            
-            #get next page
-            start_record += per_page
-            params["request"]["iDisplayStart"] = start_record
-            param_json = json.dumps(params)
-            response = self.post(url,headers=headers,data=param_json)
-            response = self.decode_json(response.json()["d"])
-            data = response["aaData"]
+            bill.add_source(bill_source_url)
+            self.save_bill(bill)
     
     def get_member_ids(self):
         member_dict = {} #three levels: from session to member_id to name
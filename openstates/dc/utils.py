@@ -0,0 +1,95 @@
+import json
+import itertools
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+
+def decode_json(value):
+    '''
+    The "json" LIMS sends is recursively string-encoded: strings inside
+    the decoded data may themselves be json. Decodes all of it, without
+    recursion.
+    '''
+    loads = json.loads
+    while type(value) in (str, unicode) and value and value[0] in '[{':
+        value = loads(value)
+
+    stack = [value]
+    while stack:
+        container = stack.pop()
+        if type(container) is dict:
+            items = container.iteritems()
+        elif type(container) is list:
+            items = enumerate(container)
+        else:
+            continue
+        for key, item in items:
+            kind = type(item)
+            if kind is unicode or kind is str:
+                if not item or item[0] not in '[{':
+                    continue
+                while (kind is unicode or kind is str) and item and \
+                        item[0] in '[{':
+                    item = loads(item)
+                    kind = type(item)
+                # replacing a value doesn't disturb the iteration
+                container[key] = item
+            if kind is dict or kind is list:
+                stack.append(item)
+    return value
+
+
+def imap_bounded(func, args, processes=4):
+    '''
+    Yields func(arg) for each of args, in order, calling func from
+    `processes` threads, with at most `processes` results fetched ahead
+    of the one being read.
+    '''
+    args = iter(args)
+    pool = ThreadPool(processes)
+    try:
+        pending = deque(pool.apply_async(func, (arg,)) for arg in
+                        itertools.islice(args, processes))
+        while pending:
+            result = pending.popleft().get()
+            for arg in itertools.islice(args, 1):
+                pending.append(pool.apply_async(func, (arg,)))
+            yield result
+    finally:
+        pool.terminate()
+
+
+def search_pages(fetch_page, per_page, processes=4):
+    '''
+    Yields each page of search results (its aaData), in order.
+
+    fetch_page(start) returns the decoded response for the page of
+    `per_page` records starting at record `start`. Once the first page
+    gives the total record count, the remaining pages are fetched
+    `processes` at a time, at most `processes` ahead of the one being
+    read. If there's no count, or there turn out to be
+    more records than it said, pages are fetched one at a time until one
+    comes back short.
+    '''
+    first = fetch_page(0)
+    data = first['aaData']
+    if not data:
+        return
+    yield data
+
+    start = per_page
+    total = first.get('iTotalDisplayRecords', first.get('iTotalRecords'))
+    if total is not None and len(data) == per_page:
+        offsets = xrange(per_page, int(total), per_page)
+        for page in imap_bounded(fetch_page, offsets, processes):
+            data = page['aaData']
+            yield data
+            start += per_page
+
+    # a short page is the last one
+    while len(data) == per_page:
+        data = fetch_page(start)['aaData']
+        if not data:
+            return
+        yield data
+        start += per_page
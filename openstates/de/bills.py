@@ -6,12 +6,12 @@ import actions
 from billy.scrape import ScrapeError
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from openstates.utils import LXMLMixin
+from openstates.utils import LXMLMixin, CachedCategorizer
 
 
 class DEBillScraper(BillScraper, LXMLMixin):
     jurisdiction = 'de'
-    categorizer = actions.Categorizer()
+    categorizer = CachedCategorizer(actions.Categorizer())
 
     def separate_names(self,text):
         text = text.replace("&nbsp","")
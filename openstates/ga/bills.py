@@ -1,7 +1,12 @@
+import os
+
+from billy.core import settings
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 from collections import defaultdict
-from .util import get_client, get_url, backoff
+from multiprocessing.pool import ThreadPool
+from openstates.utils import DiskCache
+from .util import Service, get_url, backoff, pacer, GA_MAX_IN_FLIGHT
 
 #         Methods (7):
 #            GetLegislationDetail(xs:int LegislationId, )
@@ -22,26 +27,84 @@ from .util import get_client, get_url, backoff
 #            GetTitles()
 
 
-member_cache = {}
+# Members are kept on disk between runs for this many days.
+GA_MEMBER_CACHE_DAYS = getattr(settings, 'GA_MEMBER_CACHE_DAYS', 30)
+GA_MEMBER_CACHE_DAYS = int(os.environ.get('GA_MEMBER_CACHE_DAYS',
+                                          GA_MEMBER_CACHE_DAYS))
 SOURCE_URL = 'http://www.legis.ga.gov/Legislation/en-US/display/{session}/{bid}'
 
 
 class GABillScraper(BillScraper):
     jurisdiction = 'ga'
-    lservice = get_client('Legislation').service
-    vservice = get_client('Votes').service
-    mservice = get_client('Members').service
+    lservice = Service('Legislation')
+    vservice = Service('Votes')
+    mservice = Service('Members')
     lsource = get_url('Legislation')
     msource = get_url('Members')
     vsource = get_url('Votes')
 
-    def get_member(self, member_id):
-        if member_id in member_cache:
-            return member_cache[member_id]
+    @staticmethod
+    def member_record(member):
+        """ The parts of a member we use, as plain data that can be cached. """
+        return {'Name': dict(member['Name'])}
+
+    def fetch_member(self, member_id):
+        member = backoff(self.mservice.GetMember, member_id)
+        return member_id, self.member_record(member)
+
+    def prefetch_members(self, sid):
+        """
+        Fills the member cache with the session's roster up front, so
+        sponsors can be resolved without a call per member.
+        """
+        listing = backoff(
+            self.mservice.GetMembersBySession,
+            sid
+        )['MemberListing']
 
-        mem = backoff(self.mservice.GetMember, member_id)
-        member_cache[member_id] = mem
-        return mem
+        missing = []
+        for member in listing:
+            member_id = member['Id']
+            if member_id in self.members:
+                continue
+            name = getattr(member, 'Name', None)
+            if name is not None and 'First' in dict(name) and \
+                    'Last' in dict(name):
+                self.members.set(member_id, self.member_record(member))
+            else:
+                missing.append(member_id)
+
+        if missing:
+            pool = ThreadPool(GA_MAX_IN_FLIGHT)
+            try:
+                for member_id, record in pool.imap_unordered(
+                        self.fetch_member, missing):
+                    self.members.set(member_id, record)
+            finally:
+                pool.terminate()
+        self.members.save()
+        self.info('%d members in session, %d fetched' % (
+            len(listing), len(missing)))
+
+    def get_member(self, member_id):
+        member = self.members.get(member_id)
+        if member is None:
+            # Not on the session roster (e.g. from another session).
+            member_id, member = self.fetch_member(member_id)
+            self.members.set(member_id, member)
+        return member
+
+    def get_legislation(self, lid):
+        """ The detail for a piece of legislation and its roll calls. """
+        instrument = backoff(self.lservice.GetLegislationDetail, lid)
+        votes = []
+        # Untitled legislation is skipped, so don't fetch its votes.
+        if instrument['Caption'] is not None and instrument['Votes']:
+            for vote_ in instrument['Votes']:
+                _, vote_ = vote_
+                votes.append(backoff(self.vservice.GetVote,
+                                     vote_[0]['VoteId']))
+        return instrument, votes
 
     def scrape(self, session, chambers):
         bill_type_map = {
@@ -122,51 +185,56 @@ class GABillScraper(BillScraper):
         }
 
         sid = self.metadata['session_details'][session]['_guid']
+        self.members = DiskCache('ga_members',
+                                 expires=GA_MEMBER_CACHE_DAYS * 24 * 60 * 60)
+        self.prefetch_members(sid)
+
         legislation = backoff(
             self.lservice.GetLegislationForSession,
             sid
         )['LegislationIndex']
 
-        for leg in legislation:
-            lid = leg['Id']
-            instrument = backoff(self.lservice.GetLegislationDetail, lid)
-            history = [x for x in instrument['StatusHistory'][0]]
-
-            actions = reversed([{
-                'code': x['Code'],
-                'action': x['Description'],
-                '_guid': x['Id'],
-                'date': x['Date']
-            } for x in history])
-
-            guid = instrument['Id']
-
-            # A little bit hacky.
-            bill_prefix = instrument['DocumentType']
-            bill_chamber = chamber_map[bill_prefix[0]]
-            bill_type = bill_type_map[bill_prefix[1:]]
-
-            bill_id = '%s %s' % (
-                bill_prefix,
-                instrument['Number'],
-            )
-            if instrument['Suffix']:
-                bill_id += instrument['Suffix']
-
-            title = instrument['Caption']
-            description = instrument['Summary']
+        # Details are fetched a few at a time; the pacer decides how many
+        # actually run at once.
+        pool = ThreadPool(GA_MAX_IN_FLIGHT)
+        try:
+            details = pool.imap(self.get_legislation,
+                                [leg['Id'] for leg in legislation])
+            for instrument, votes in details:
+                history = [x for x in instrument['StatusHistory'][0]]
+
+                actions = reversed([{
+                    'code': x['Code'],
+                    'action': x['Description'],
+                    '_guid': x['Id'],
+                    'date': x['Date']
+                } for x in history])
+
+                guid = instrument['Id']
+
+                # A little bit hacky.
+                bill_prefix = instrument['DocumentType']
+                bill_chamber = chamber_map[bill_prefix[0]]
+                bill_type = bill_type_map[bill_prefix[1:]]
+
+                bill_id = '%s %s' % (
+                    bill_prefix,
+                    instrument['Number'],
+                )
+                if instrument['Suffix']:
+                    bill_id += instrument['Suffix']
 
-            if title is None:
-                continue
+                title = instrument['Caption']
+                description = instrument['Summary']
 
-            bill = Bill(session, bill_chamber, bill_id, title, type=bill_type,
-                description=description, _guid=guid)
+                if title is None:
+                    continue
 
-            if instrument['Votes']:
-                for vote_ in instrument['Votes']:
-                    _, vote_ = vote_
-                    vote_ = backoff(self.vservice.GetVote, vote_[0]['VoteId'])
+                bill = Bill(session, bill_chamber, bill_id, title,
+                            type=bill_type, description=description,
+                            _guid=guid)
 
+                for vote_ in votes:
                     vote = Vote(
                         {'House': 'lower', 'Senate': 'upper'}[vote_['Branch']],
                         vote_['Date'],
@@ -194,83 +262,92 @@ class GABillScraper(BillScraper):
 
                     bill.add_vote(vote)
 
-            ccommittees = defaultdict(list)
-            committees = instrument['Committees']
-            if committees:
-                for committee in committees[0]:
-                    ccommittees[{
-                        'House': 'lower',
-                        'Senate': 'upper',
-                    }[committee['Type']]].append(committee['Name'])
-
-            for action in actions:
-                action_chamber = chamber_map[action['code'][0]]
-
-                try:
-                    action_types = action_code_map[action['code']]
-                except KeyError:
-                    error_msg = ('Code {code} for action {action} not '
-                        'recognized.'.format(
-                            code=action['code'],
-                            action=action['action']))
-
-                    self.logger.warning(error_msg)
-
-                    action_types = ['other']
-
-                committees = []
-                if any(('committee' in x for x in action_types)):
-                    committees = [str(x) for x in ccommittees.get(
-                        action_chamber, [])]
-
-                bill.add_action(action_chamber, action['action'],
-                    action['date'], action_types, committees=committees,
-                    _code=action['code'], _code_id=action['_guid'])
-
-            sponsors = []
-            if instrument['Authors']:
-                sponsors = instrument['Authors']['Sponsorship']
-                if 'Sponsors' in instrument and instrument['Sponsors']:
-                    sponsors += instrument['Sponsors']['Sponsorship']
-
-            sponsors = [
-                (x['Type'], self.get_member(x['MemberId'])) for x in sponsors
-            ]
-
-            for typ, sponsor in sponsors:
-                name = '{First} {Last}'.format(**dict(sponsor['Name']))
-                bill.add_sponsor(
-                    'primary' if 'Author' in typ else 'seconday',
-                     name
-                )
+                ccommittees = defaultdict(list)
+                committees = instrument['Committees']
+                if committees:
+                    for committee in committees[0]:
+                        ccommittees[{
+                            'House': 'lower',
+                            'Senate': 'upper',
+                        }[committee['Type']]].append(committee['Name'])
+
+                for action in actions:
+                    action_chamber = chamber_map[action['code'][0]]
+
+                    try:
+                        action_types = action_code_map[action['code']]
+                    except KeyError:
+                        error_msg = ('Code {code} for action {action} not '
+                            'recognized.'.format(
+                                code=action['code'],
+                                action=action['action']))
+
+                        self.logger.warning(error_msg)
+
+                        action_types = ['other']
+
+                    committees = []
+                    if any(('committee' in x for x in action_types)):
+                        committees = [str(x) for x in ccommittees.get(
+                            action_chamber, [])]
+
+                    bill.add_action(action_chamber, action['action'],
+                        action['date'], action_types, committees=committees,
+                        _code=action['code'], _code_id=action['_guid'])
+
+                sponsors = []
+                if instrument['Authors']:
+                    sponsors = instrument['Authors']['Sponsorship']
+                    if 'Sponsors' in instrument and instrument['Sponsors']:
+                        sponsors += instrument['Sponsors']['Sponsorship']
+
+                sponsors = [
+                    (x['Type'], self.get_member(x['MemberId']))
+                    for x in sponsors
+                ]
 
-            for version in instrument['Versions']['DocumentDescription']:
-                name, url, doc_id, version_id = [
-                    version[x] for x in [
-                        'Description',
-                        'Url',
-                        'Id',
-                        'Version'
+                for typ, sponsor in sponsors:
+                    name = '{First} {Last}'.format(**dict(sponsor['Name']))
+                    bill.add_sponsor(
+                        'primary' if 'Author' in typ else 'seconday',
+                         name
+                    )
+
+                for version in instrument['Versions']['DocumentDescription']:
+                    name, url, doc_id, version_id = [
+                        version[x] for x in [
+                            'Description',
+                            'Url',
+                            'Id',
+                            'Version'
+                        ]
                     ]
-                ]
-                bill.add_version(
-                    name,
-                    url,
-                    mimetype='application/pdf',
-                    _internal_document_id=doc_id,
-                    _version_id=version_id
+                    bill.add_version(
+                        name,
+                        url,
+                        mimetype='application/pdf',
+                        _internal_document_id=doc_id,
+                        _version_id=version_id
+                    )
+
+                versions = sorted(
+                    bill['versions'],
+                    key=lambda x: x['_internal_document_id']
                 )
-
-            versions = sorted(
-                bill['versions'],
-                key=lambda x: x['_internal_document_id']
-            )
-            bill['versions'] = versions
-
-            bill.add_source(self.msource)
-            bill.add_source(self.lsource)
-            bill.add_source(SOURCE_URL.format(**{
-                'session': session,
-                'bid': guid,
-            }))
-            self.save_bill(bill)
+                bill['versions'] = versions
+
+                bill.add_source(self.msource)
+                bill.add_source(self.lsource)
+                bill.add_source(SOURCE_URL.format(**{
+                    'session': session,
+                    'bid': guid,
+                }))
+                self.save_bill(bill)
+        finally:
+            pool.terminate()
+        self.members.save()
+        stats = pacer.stats()
+        self.info('%d calls, %d failures, %.0fs throttled '
+                  '(delay now %.2fs, %d in flight)' % (
+                      stats['calls'], stats['failures'], stats['throttled'],
+                      stats['delay'], stats['in_flight_limit']))
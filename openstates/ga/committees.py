@@ -1,7 +1,7 @@
 import time
 
 from billy.scrape.committees import CommitteeScraper, Committee
-from .util import get_client, get_url, backoff
+from .util import Service, get_url, backoff
 
 
 CTTIE_URL = ("http://www.house.ga.gov/COMMITTEES/en-US/committee.aspx?"
@@ -12,7 +12,7 @@ class GACommitteeScraper(CommitteeScraper):
     jurisdiction = 'ga'
     latest_only = True
 
-    cservice = get_client("Committees").service
+    cservice = Service("Committees")
     csource = get_url("Committees")
     ctty_cache = {}
 
@@ -2,7 +2,7 @@ import time
 
 from openstates.utils import LXMLMixin
 from billy.scrape.legislators import LegislatorScraper, Legislator
-from .util import get_client, get_url, backoff
+from .util import Service, get_url, backoff
 
 import lxml
 
@@ -17,7 +17,7 @@ HOMEPAGE_URLS = {
 
 class GALegislatorScraper(LegislatorScraper, LXMLMixin):
     jurisdiction = 'ga'
-    sservice = get_client("Members").service
+    sservice = Service("Members")
     ssource = get_url("Members")
 
     def clean_list(self, dirty_list):
@@ -1,10 +1,16 @@
 from suds.client import Client
+from suds.cache import ObjectCache
+import os
 import logging
 import socket
+import threading
 import urllib2
 import time
 import suds
 
+from billy.core import settings
+from openstates.utils import cache_path
+
 logging.getLogger('suds').setLevel(logging.WARNING)
 log = logging.getLogger('billy')
 
@@ -12,39 +18,178 @@ log = logging.getLogger('billy')
 url = 'http://webservices.legis.ga.gov/GGAServices/%s/Service.svc?wsdl'
 
 
+# Parsed WSDLs are kept on disk this long, so building a client doesn't
+# need the service to be up (or fast).
+GA_WSDL_CACHE_DAYS = getattr(settings, 'GA_WSDL_CACHE_DAYS', 7)
+GA_WSDL_CACHE_DAYS = int(os.environ.get('GA_WSDL_CACHE_DAYS',
+                                        GA_WSDL_CACHE_DAYS))
+
+_clients = {}
+_clients_lock = threading.Lock()
+_local = threading.local()
+
+
+def wsdl_cache():
+    return ObjectCache(location=cache_path('ga_wsdl', ''),
+                       days=GA_WSDL_CACHE_DAYS)
+
+
 def get_client(service):
-    client = backoff(Client, get_url(service), autoblend=True)
-    return client
+    """ Returns the process-wide client for a service, built on first use. """
+    with _clients_lock:
+        if service not in _clients:
+            _clients[service] = backoff(Client, get_url(service),
+                                        autoblend=True, cache=wsdl_cache())
+        return _clients[service]
 
 
 def get_url(service):
     return url % (service)
 
 
-def backoff(function, *args, **kwargs):
-    retries = 5
-    nice = 0
+class Service(object):
+    """
+    A scraper attribute for a service's methods, e.g.
+
+        lservice = Service('Legislation')
+
+    The client isn't built until the attribute is first used, so importing
+    a scraper doesn't touch the web service.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def __get__(self, instance, owner):
+        # suds clients keep per-call state, so each thread gets a clone
+        # (which shares the parsed WSDL).
+        clients = _local.__dict__.setdefault('clients', {})
+        if self.service not in clients:
+            clients[self.service] = get_client(self.service).clone()
+        return clients[self.service].service
+
+
+# Upper bound on concurrent calls to the service; the pacer starts at one
+# and only opens up while calls keep succeeding.
+GA_MAX_IN_FLIGHT = getattr(settings, 'GA_MAX_IN_FLIGHT', 4)
+GA_MAX_IN_FLIGHT = int(os.environ.get('GA_MAX_IN_FLIGHT', GA_MAX_IN_FLIGHT))
+
 
-    def _():
-        time.sleep(1)  # Seems like their server can't handle the load.
-        return function(*args, **kwargs)
+class Pacer(object):
+    """
+    Adaptive pacing for calls to the GA web service: additive increase,
+    multiplicative decrease, as in TCP congestion control.
 
-    for attempt in range(retries):
+    Calls are started at least ``delay`` seconds apart, with at most
+    ``limit`` in flight. Each success shrinks the delay a little, and
+    every ``limit`` successes in a row let one more call run at once (up
+    to ``max_in_flight``). A failure doubles the delay and halves the
+    limit. Time spent held back is added up in ``throttled``.
+    """
+
+    def __init__(self, delay=1.0, min_delay=0.05, max_delay=120,
+                 max_in_flight=GA_MAX_IN_FLIGHT):
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_in_flight = max_in_flight
+        self.limit = 1
+        self.in_flight = 0
+        self.streak = 0
+        self.next_start = 0
+        self.calls = 0
+        self.failures = 0
+        self.throttled = 0.0
+        self._cond = threading.Condition()
+
+    def start(self):
+        """Blocks until a call may start."""
+        waited_since = time.time()
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+            now = time.time()
+            start_at = max(now, self.next_start)
+            self.next_start = start_at + self.delay
+        time.sleep(start_at - now)
+        with self._cond:
+            self.calls += 1
+            self.throttled += time.time() - waited_since
+
+    def release(self):
+        """Ends a call without judging the service by it."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def succeeded(self):
+        with self._cond:
+            self.in_flight -= 1
+            self.delay = max(self.min_delay, self.delay * 0.9)
+            self.streak += 1
+            if self.streak >= self.limit and self.limit < self.max_in_flight:
+                self.limit += 1
+                self.streak = 0
+            self._cond.notify_all()
+
+    def failed(self):
+        """Backs off; returns how long the caller should wait to retry."""
+        with self._cond:
+            self.in_flight -= 1
+            self.failures += 1
+            self.streak = 0
+            self.delay = min(self.max_delay, self.delay * 2)
+            self.limit = max(1, self.limit // 2)
+            self.next_start = max(self.next_start, time.time() + self.delay)
+            self._cond.notify_all()
+            return self.delay
+
+    def stats(self):
+        return dict(calls=self.calls, failures=self.failures,
+                    throttled=self.throttled, delay=self.delay,
+                    in_flight_limit=self.limit)
+
+
+# Shared by every GA scraper in the process.
+pacer = Pacer()
+
+# A failed call is retried GA_RETRIES times, waiting at least
+# GA_RETRY_BACKOFF seconds more after each failure than after the last
+# (15, 30, 45, ... by default), or longer if the pacer says so.
+GA_RETRIES = getattr(settings, 'GA_RETRIES', 5)
+GA_RETRIES = int(os.environ.get('GA_RETRIES', GA_RETRIES))
+GA_RETRY_BACKOFF = getattr(settings, 'GA_RETRY_BACKOFF', 15)
+GA_RETRY_BACKOFF = float(os.environ.get('GA_RETRY_BACKOFF',
+                                        GA_RETRY_BACKOFF))
+
+
+def backoff(function, *args, **kwargs):
+    for attempt in range(GA_RETRIES):
+        pacer.start()
         try:
-            return _()
+            result = function(*args, **kwargs)
         except (socket.timeout, urllib2.URLError, suds.WebFault) as e:
             if "This Roll Call Vote is not published." in e.message:
+                pacer.release()
                 raise ValueError("Roll Call Vote isn't published")
 
-            backoff = ((attempt + 1) * 15)
+            wait = max(pacer.failed(), (attempt + 1) * GA_RETRY_BACKOFF)
+
             log.warning(
-                "[attempt %s]: Connection broke. Backing off for %s seconds." % (
+                "[attempt %s]: Connection broke. Backing off for %.1f seconds." % (
                     attempt,
-                    backoff
+                    wait
                 )
             )
             log.info(str(e))
-            time.sleep(backoff)
+            time.sleep(wait)
+        except:
+            pacer.release()
+            raise
+        else:
+            pacer.succeeded()
+            return result
 
     raise ValueError(
         "The server's not playing nice. We can't keep slamming it."
@@ -1,4 +1,5 @@
-from billy.utils.fulltext import pdfdata_to_text, text_after_line_numbers
+from billy.utils.fulltext import text_after_line_numbers
+from openstates.utils.pdf import pdfdata_to_text
 from .bills import HIBillScraper
 from .legislators import HILegislatorScraper
 from .events import HIEventScraper
@@ -5,7 +5,7 @@ import collections
 
 import lxml.etree
 
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 from billy.scrape.votes import VoteScraper, Vote
 from .scraper import InvalidHTTPSScraper
 
@@ -1,6 +1,7 @@
 import datetime
 import lxml.html
-from billy.utils.fulltext import pdfdata_to_text, text_after_line_numbers
+from billy.utils.fulltext import text_after_line_numbers
+from openstates.utils.pdf import pdfdata_to_text
 from .bills import INBillScraper
 from .legislators import INLegislatorScraper
 from .committees import INCommitteeScraper
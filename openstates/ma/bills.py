@@ -8,11 +8,12 @@ import lxml.html
 from billy.scrape.bills import BillScraper, Bill
 
 from .actions import Categorizer
+from openstates.utils import CachedCategorizer
 
 
 class MABillScraper(BillScraper):
     jurisdiction = 'ma'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
 
     def __init__(self, *args, **kwargs):
         super(MABillScraper, self).__init__(*args, **kwargs)
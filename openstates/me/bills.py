@@ -11,12 +11,13 @@ from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 
 from .actions import Categorizer
+from openstates.utils import CachedCategorizer
 import logging
 
 
 class MEBillScraper(BillScraper):
     jurisdiction = 'me'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
 
     def scrape(self, chamber, session):
         # Create a Bill for each Paper of the chamber's session
@@ -1,7 +1,7 @@
 from .utils import chamber_name, parse_ftp_listing
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import VoteScraper, Vote
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 from datetime import datetime
 import lxml.etree
 import os
@@ -9,7 +9,7 @@ from collections import defaultdict
 
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 from scrapelib import HTTPError
 
 import lxml.html
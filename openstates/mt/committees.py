@@ -13,7 +13,7 @@ from collections import defaultdict
 import lxml.html
 
 from billy.scrape.committees import CommitteeScraper, Committee
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 import scrapelib
 
 
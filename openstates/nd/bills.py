@@ -6,6 +6,7 @@ from billy.scrape import NoDataForPeriod, ScrapeError
 from billy.scrape.bills import Bill, BillScraper
 from billy.scrape.votes import Vote
 from .actions import NDCategorizer
+from openstates.utils import CachedCategorizer
 import re
 
 base_url = "http://www.legis.nd.gov/assembly/%s-%s/subject-index/major-topic.html"
@@ -17,7 +18,7 @@ class NDBillScraper(BillScraper):
     Dakota legislature and stores it in the openstates  backend.
     """
     jurisdiction = 'nd'
-    categorizer = NDCategorizer()
+    categorizer = CachedCategorizer(NDCategorizer())
 
     def scrape_actions(self, session, subject, href, bid):
         page = self.get(href).text
@@ -1,7 +1,7 @@
 from openstates.utils import LXMLMixin
 import requests.exceptions
 from billy.scrape.votes import VoteScraper, Vote
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 import datetime
 import lxml
 import os
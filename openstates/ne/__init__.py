@@ -1,6 +1,6 @@
 import re
 import datetime
-from billy.utils.fulltext import pdfdata_to_text
+from openstates.utils.pdf import pdfdata_to_text
 from .bills import NEBillScraper
 from .legislators import NELegislatorScraper
 from .committees import NECommitteeScraper
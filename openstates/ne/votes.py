@@ -3,7 +3,7 @@ import re
 import datetime
 
 from billy.scrape.votes import VoteScraper, Vote
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 
 BILL_RE = re.compile('^LEGISLATIVE (BILL|RESOLUTION) (\d+C?A?).')
 VETO_BILL_RE = re.compile('MOTION - Override (?:Line-Item )?Veto on (\w+)')
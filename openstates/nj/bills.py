@@ -4,9 +4,25 @@ import zipfile
 import csv
 import os
 from datetime import datetime
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
 from .utils import chamber_name, MDBMixin
+from billy.core import settings
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
+from openstates.utils import DiskCache, cache_path, env_flag
+from openstates.utils.mdb import listing_stamps
+
+# Skip sessions whose database and vote archives haven't changed since
+# they were last scraped.
+NJ_INCREMENTAL = getattr(settings, 'NJ_INCREMENTAL', False)
+NJ_INCREMENTAL = env_flag('NJ_INCREMENTAL', NJ_INCREMENTAL)
+
+# Vote archives fetched and parsed at once.
+NJ_VOTE_FETCHES = getattr(settings, 'NJ_VOTE_FETCHES', 3)
+NJ_VOTE_FETCHES = int(os.environ.get('NJ_VOTE_FETCHES', NJ_VOTE_FETCHES))
+
+VOTES_BASE = 'ftp://www.njleg.state.nj.us/votes/'
 
 
 class NJBillScraper(BillScraper, MDBMixin):
@@ -156,12 +172,130 @@ class NJBillScraper(BillScraper, MDBMixin):
 
         return (act_str, 'other')
 
+    def vote_files(self, year_abr):
+        next_year = int(year_abr)+1
+        return ['A%s' % year_abr,
+                'A%s' % next_year,
+                'S%s' % year_abr,
+                'S%s' % next_year,
+                'CA%s-%s' % (year_abr, next_year),
+                'CS%s-%s' % (year_abr, next_year),
+               ]
+
     def scrape(self, session, chambers):
         year_abr = ((int(session) - 209) * 2) + 2000
         self._init_mdb(year_abr)
+
+        # what this session's data looks like, per the FTP listings
+        self.vote_stamps = vote_stamps = listing_stamps(
+            self.get(VOTES_BASE).text)
+        stamp = (self.mdb_stamp, [vote_stamps.get(name + '.zip')
+                                  for name in self.vote_files(year_abr)])
+        scraped = DiskCache('nj_scraped')
+        if NJ_INCREMENTAL and self.mdb_stamp and \
+                scraped.get(session) == stamp:
+            self.info('nothing changed for session %s, skipping' % session)
+            return
+
         self.initialize_committees(year_abr)
         self.scrape_bills(session, year_abr)
 
+        scraped.set(session, stamp)
+        scraped.save()
+
+    def parse_vote_archive(self, filename, data):
+        """ votes, keyed by vote id, from one of the votes/ zip archives """
+        zipedfile = zipfile.ZipFile(StringIO(data))
+        votes = {}
+        for vfile in ["%s.txt" % (filename), "%sEnd.txt" % (filename)]:
+            try:
+                vote_file = zipedfile.open(vfile, 'U')
+            except KeyError:
+                #
+                # Right, so, 2011 we have an "End" file with more
+                # vote data than was in the original dump.
+                #
+                self.warning("No such file: %s" % (vfile))
+                continue
+
+            vdict_file = csv.DictReader(vote_file)
+
+            votes = {}
+            if filename.startswith('A') or filename.startswith('CA'):
+                chamber = "lower"
+            else:
+                chamber = "upper"
+
+            if filename.startswith('C'):
+                vote_file_type = 'committee'
+            else:
+                vote_file_type = 'chamber'
+
+            for rec in vdict_file:
+
+                if vote_file_type == 'chamber':
+                    bill_id = rec["Bill"].strip()
+                    leg = rec["Full_Name"]
+
+                    date = rec["Session_Date"]
+                    action = rec["Action"]
+                    leg_vote = rec["Legislator_Vote"]
+                else:
+                    bill_id = '%s%s' % (rec['Bill_Type'], rec['Bill_Number'])
+                    leg = rec['Name']
+                    # drop time portion
+                    date = rec['Agenda_Date'].split()[0]
+                    # make motion readable
+                    action = self._com_vote_motions[rec['BillAction']]
+                    # first char (Y/N) use [0:1] to ignore ''
+                    leg_vote = rec['LegislatorVote'][0:1]
+
+                date = datetime.strptime(date, "%m/%d/%Y")
+                vote_id = '_'.join((bill_id, chamber, action))
+                vote_id = vote_id.replace(" ", "_")
+
+                if vote_id not in votes:
+                    votes[vote_id] = Vote(chamber, date, action, None, None,
+                                          None, None, bill_id=bill_id)
+                if vote_file_type == 'committee':
+                    votes[vote_id]['committee'] = self._committees[
+                        rec['Committee_House']]
+
+                if leg_vote == "Y":
+                    votes[vote_id].yes(leg)
+                elif leg_vote == "N":
+                    votes[vote_id].no(leg)
+                else:
+                    votes[vote_id].other(leg)
+        return votes
+
+    def scrape_vote_archive(self, filename):
+        """ fetch & parse a vote archive, reusing the copy we downloaded
+        before if the FTP listing shows it hasn't changed """
+        s_vote_url = VOTES_BASE + '%s.zip' % filename
+        path = cache_path('nj_votes', '%s.zip' % filename)
+        stamp = self.vote_stamps.get('%s.zip' % filename)
+        if stamp and self.vote_archives.get(filename) == stamp and \
+                os.path.exists(path):
+            self.info('%s unchanged (%s), using saved copy' % (s_vote_url,
+                                                               stamp))
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            try:
+                data = self.get(s_vote_url).content
+            except scrapelib.FTPError:
+                self.warning('could not find %s' % s_vote_url)
+                return None
+            tmp = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.rename(tmp, path)
+            if stamp:
+                self.vote_archives.set(filename, stamp)
+
+        return self.parse_vote_archive(filename, data)
+
     def scrape_bills(self, session, year_abr):
         #Main Bill information
         main_bill_csv = self.access_to_csv('MainBill')
@@ -192,15 +326,10 @@ class NJBillScraper(BillScraper, MDBMixin):
             bill_dict[bill_id] = bill
 
         #Sponsors
-        bill_sponsors_csv = self.access_to_csv('BillSpon')
+        bill_sponsors_csv = self.bill_rows('BillSpon')
 
         for rec in bill_sponsors_csv:
-            bill_type = rec["BillType"].strip()
-            bill_number = int(rec["BillNumber"])
-            bill_id = bill_type + str(bill_number)
-            if bill_id not in bill_dict:
-                self.warning('unknown bill %s in sponsor database' % bill_id)
-                continue
+            bill_id = rec['_bill_id']
             bill = bill_dict[bill_id]
             name = rec["Sponsor"]
             sponsor_type = rec["Type"]
@@ -212,15 +341,10 @@ class NJBillScraper(BillScraper, MDBMixin):
 
 
         #Documents
-        bill_document_csv = self.access_to_csv('BillWP')
+        bill_document_csv = self.bill_rows('BillWP')
 
         for rec in bill_document_csv:
-            bill_type = rec["BillType"].strip()
-            bill_number = int(rec["BillNumber"])
-            bill_id = bill_type + str(bill_number)
-            if bill_id not in bill_dict:
-                self.warning('unknown bill %s in document database' % bill_id)
-                continue
+            bill_id = rec['_bill_id']
             bill = bill_dict[bill_id]
             document = rec["Document"]
             document = document.split('\\')
@@ -254,86 +378,19 @@ class NJBillScraper(BillScraper, MDBMixin):
                 bill.add_document(doc_name, htm_url)
 
         # Votes
-        next_year = int(year_abr)+1
-        vote_info_list = ['A%s' % year_abr,
-                          'A%s' % next_year,
-                          'S%s' % year_abr,
-                          'S%s' % next_year,
-                          'CA%s-%s' % (year_abr, next_year),
-                          'CS%s-%s' % (year_abr, next_year),
-                         ]
-
-        for filename in vote_info_list:
-            s_vote_url = 'ftp://www.njleg.state.nj.us/votes/%s.zip' % filename
-            try:
-                s_vote_zip, resp = self.urlretrieve(s_vote_url)
-            except scrapelib.FTPError:
-                self.warning('could not find %s' % s_vote_url)
+        # the archives are independent, so fetch and parse them together
+        self.vote_archives = DiskCache('nj_vote_archive_stamps')
+        pool = ThreadPool(NJ_VOTE_FETCHES)
+        try:
+            archives = pool.map(self.scrape_vote_archive,
+                                self.vote_files(year_abr))
+        finally:
+            pool.terminate()
+        self.vote_archives.save()
+
+        for votes in archives:
+            if votes is None:
                 continue
-            zipedfile = zipfile.ZipFile(s_vote_zip)
-            for vfile in ["%s.txt" % (filename), "%sEnd.txt" % (filename)]:
-                try:
-                    vote_file = zipedfile.open(vfile, 'U')
-                except KeyError:
-                    #
-                    # Right, so, 2011 we have an "End" file with more
-                    # vote data than was in the original dump.
-                    #
-                    self.warning("No such file: %s" % (vfile))
-                    continue
-
-                vdict_file = csv.DictReader(vote_file)
-
-                votes = {}
-                if filename.startswith('A') or filename.startswith('CA'):
-                    chamber = "lower"
-                else:
-                    chamber = "upper"
-
-                if filename.startswith('C'):
-                    vote_file_type = 'committee'
-                else:
-                    vote_file_type = 'chamber'
-
-                for rec in vdict_file:
-
-                    if vote_file_type == 'chamber':
-                        bill_id = rec["Bill"].strip()
-                        leg = rec["Full_Name"]
-
-                        date = rec["Session_Date"]
-                        action = rec["Action"]
-                        leg_vote = rec["Legislator_Vote"]
-                    else:
-                        bill_id = '%s%s' % (rec['Bill_Type'], rec['Bill_Number'])
-                        leg = rec['Name']
-                        # drop time portion
-                        date = rec['Agenda_Date'].split()[0]
-                        # make motion readable
-                        action = self._com_vote_motions[rec['BillAction']]
-                        # first char (Y/N) use [0:1] to ignore ''
-                        leg_vote = rec['LegislatorVote'][0:1]
-
-                    date = datetime.strptime(date, "%m/%d/%Y")
-                    vote_id = '_'.join((bill_id, chamber, action))
-                    vote_id = vote_id.replace(" ", "_")
-
-                    if vote_id not in votes:
-                        votes[vote_id] = Vote(chamber, date, action, None, None,
-                                              None, None, bill_id=bill_id)
-                    if vote_file_type == 'committee':
-                        votes[vote_id]['committee'] = self._committees[
-                            rec['Committee_House']]
-
-                    if leg_vote == "Y":
-                        votes[vote_id].yes(leg)
-                    elif leg_vote == "N":
-                        votes[vote_id].no(leg)
-                    else:
-                        votes[vote_id].other(leg)
-
-            # remove temp file
-            os.remove(s_vote_zip)
 
             #Counts yes/no/other votes and saves overall vote
             for vote in votes.itervalues():
@@ -367,16 +424,11 @@ class NJBillScraper(BillScraper, MDBMixin):
                 bill.add_vote(vote)
 
         #Actions
-        bill_action_csv = self.access_to_csv('BillHist')
+        bill_action_csv = self.bill_rows('BillHist')
         actor_map = {'A': 'lower', 'G': 'executive', 'S': 'upper'}
 
         for rec in bill_action_csv:
-            bill_type = rec["BillType"].strip()
-            bill_number = int(rec["BillNumber"])
-            bill_id = bill_type + str(bill_number)
-            if bill_id not in bill_dict:
-                self.warning('unknown bill %s in action database' % bill_id)
-                continue
+            bill_id = rec['_bill_id']
             bill = bill_dict[bill_id]
             action = rec["Action"]
             date = rec["DateAction"]
@@ -389,17 +441,10 @@ class NJBillScraper(BillScraper, MDBMixin):
             bill.add_action(actor, action, date, type=atype)
 
         # Subjects
-        subject_csv = self.access_to_csv('BillSubj')
+        subject_csv = self.bill_rows('BillSubj')
         for rec in subject_csv:
-            bill_id = rec['BillType'].strip() + str(int(rec['BillNumber']))
-            if bill_id not in bill_dict:
-                self.warning('unknown bill %s in subject database' % bill_id)
-                continue
-            bill = bill_dict.get(bill_id)
-            if bill:
-                bill.setdefault('subjects', []).append(rec['SubjectKey'])
-            else:
-                self.warning('invalid bill id in BillSubj: %s' % bill_id)
+            bill = bill_dict[rec['_bill_id']]
+            bill.setdefault('subjects', []).append(rec['SubjectKey'])
 
         phony_bill_count = 0
         # save all bills at the end
@@ -1,8 +1,22 @@
-import os
 import re
-import csv
-import zipfile
-import subprocess
+
+from openstates.utils.mdb import listing_stamps, mirror_remote
+
+# A bill's key as the bill scraper reads it: the type trimmed and the
+# number as an integer. MainBill is indexed on it, so the tables that hang
+# off MainBill are joined to it with index lookups.
+MDB_INDEXES = {'MainBill': ['trim(BillType), CAST(BillNumber AS INTEGER)']}
+
+BILL_ROWS_SQL = '''
+SELECT trim(t.BillType) || CAST(t.BillNumber AS INTEGER) AS _bill_id, t.*
+FROM "%s" t
+WHERE EXISTS (SELECT 1 FROM MainBill m
+              WHERE trim(m.BillType) = trim(t.BillType)
+              AND CAST(m.BillNumber AS INTEGER) =
+                  CAST(t.BillNumber AS INTEGER)
+              AND m.Synopsis != '')
+'''
+
 
 def clean_committee_name(comm_name):
     comm_name = comm_name.strip()
@@ -30,17 +44,26 @@ class MDBMixin(object):
 
     def _init_mdb(self, year):
         self.mdbfile = 'DB%s.mdb' % year
-        url = 'ftp://www.njleg.state.nj.us/ag/%sdata/DB%s.zip' % (year, year)
-        fname, resp = self.urlretrieve(url)
-        zf = zipfile.ZipFile(fname)
-        zf.extract(self.mdbfile)
-        os.remove(fname)
+        base = 'ftp://www.njleg.state.nj.us/ag/%sdata/' % year
+        zipname = 'DB%s.zip' % year
+        # the listing tells us whether the zip changed since we mirrored it
+        self.mdb_stamp = listing_stamps(self.get(base).text).get(zipname)
+        self.mdb = mirror_remote(
+            self, base + zipname, self.mdb_stamp, self.mdbfile,
+            'nj_DB%s' % year, MDB_INDEXES)
 
-    # stolen from nm/bills.py
     def access_to_csv(self, table):
-        """ using mdbtools, read access tables as CSV """
-        commands = ['mdb-export', self.mdbfile, table]
-        pipe = subprocess.Popen(commands, stdout=subprocess.PIPE,
-                                                        close_fds=True).stdout
-        csvfile = csv.DictReader(pipe)
-        return csvfile
+        """ read an Access table (from the SQLite mirror) as dicts """
+        return self.mdb.table(table)
+
+    def bill_rows(self, table):
+        """ the rows of a table that hangs off MainBill, joined to the
+        bills the scraper keeps (those with a title); each row's bill id
+        is in _bill_id """
+        rows = self.mdb.query(BILL_ROWS_SQL % table)
+        total, = self.mdb.db.execute(
+            'SELECT count(*) FROM "%s"' % table).fetchone()
+        if total > len(rows):
+            self.warning('skipped %d rows in %s for unknown or untitled '
+                         'bills' % (total - len(rows), table))
+        return rows
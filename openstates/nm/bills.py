@@ -1,18 +1,38 @@
 import os
 import re
-import csv
-import zipfile
-import subprocess
+import hashlib
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 
 import lxml.html
+import requests
 import scrapelib
 
+from billy.core import settings
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import pdfdata_to_text
 
 from .actions import Categorizer
+from openstates.utils import CachedCategorizer, DiskCache, env_flag
+from openstates.utils.mdb import listing_stamps, mirror_remote
+
+# Skip chambers whose database hasn't changed since they were last
+# scraped. Only the database is checked, not the documents on the site.
+NM_INCREMENTAL = getattr(settings, 'NM_INCREMENTAL', False)
+NM_INCREMENTAL = env_flag('NM_INCREMENTAL', NM_INCREMENTAL)
+
+# Documents are probed this many at a time when deduping, and their
+# fingerprints kept this many days.
+NM_HEAD_REQUESTS = getattr(settings, 'NM_HEAD_REQUESTS', 8)
+NM_HEAD_REQUESTS = int(os.environ.get('NM_HEAD_REQUESTS', NM_HEAD_REQUESTS))
+NM_FINGERPRINT_DAYS = getattr(settings, 'NM_FINGERPRINT_DAYS', 7)
+NM_FINGERPRINT_DAYS = int(os.environ.get('NM_FINGERPRINT_DAYS',
+                                         NM_FINGERPRINT_DAYS))
+
+# the chamber letter of a BillID (e.g. 'H' for ' HB  12'), indexed in the
+# mirror so each chamber's rows can be looked up
+BILL_CHAMBER_SQL = "substr(replace(BillID, ' ', ''), 1, 1)"
 
 # {spaces}{vote indicator (Y/N/E/ )}{name}{lookahead:2 spaces, space-indicator}
 HOUSE_VOTE_RE = re.compile('([YNE ])\s+([A-Z][a-z\'].+?)(?=\s[\sNYE])')
@@ -94,7 +114,10 @@ def convert_sv_char(c):
 
 class NMBillScraper(BillScraper):
     jurisdiction = 'nm'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
+    # each chamber reads only its own bills and actions
+    mdb_indexes = {'Legislation': [BILL_CHAMBER_SQL],
+                   'Actions': [BILL_CHAMBER_SQL]}
 
     def _init_mdb(self, session):
         print session[2:]
@@ -118,25 +141,30 @@ class NMBillScraper(BillScraper):
         # all of the data is in this Access DB, download & retrieve it
         mdbfile = '%s.accdb' % fname
 
+        # the listing's time & size tell us whether the zip has changed
+        stamp = listing_stamps(listing).get(matches[-1][1])
+
         # if a new mdbfile or it has changed
         if getattr(self, 'mdbfile', None) != mdbfile:
             self.mdbfile = mdbfile
-            fname, resp = self.urlretrieve(remote_file)
-            zf = zipfile.ZipFile(fname)
-            zf.extract(self.mdbfile)
-            os.remove(fname)
+            self.mdb_stamp = stamp
+            name = 'nm_' + os.path.splitext(mdbfile)[0].replace(' ', '_')
+            try:
+                self.mdb = mirror_remote(
+                    self, remote_file, stamp, self.mdbfile, name,
+                    self.mdb_indexes)
+            except OSError:
+                self.warning("Failed to read mdb file. Have you installed 'mdbtools' ?")
+                raise
 
     def access_to_csv(self, table):
-        """ using mdbtools, read access tables as CSV """
-        commands = ['mdb-export', self.mdbfile, table]
-        try:
-            pipe = subprocess.Popen(commands, stdout=subprocess.PIPE,
-                                    close_fds=True).stdout
-            csvfile = csv.DictReader(pipe)
-            return csvfile
-        except OSError:
-            self.warning("Failed to read mdb file. Have you installed 'mdbtools' ?")
-            raise
+        """ read an Access table (from the SQLite mirror) as dicts """
+        return self.mdb.table(table)
+
+    def chamber_rows(self, table, chamber_letter):
+        """ rows of a table whose BillID is from the given chamber """
+        return self.mdb.query("SELECT * FROM %s WHERE %s = ?" % (
+            table, BILL_CHAMBER_SQL), chamber_letter)
 
     def scrape(self, chamber, session):
         chamber_letter = 'S' if chamber == 'upper' else 'H'
@@ -153,6 +181,13 @@ class NMBillScraper(BillScraper):
 
         self._init_mdb(session)
 
+        scraped = DiskCache('nm_scraped')
+        if NM_INCREMENTAL and self.mdb_stamp and \
+                scraped.get((session, chamber)) == self.mdb_stamp:
+            self.info('database unchanged for %s %s, skipping' % (session,
+                                                                  chamber))
+            return
+
         # read in sponsor & subject mappings
         sponsor_map = {}
         for sponsor in self.access_to_csv('tblSponsors'):
@@ -164,14 +199,10 @@ class NMBillScraper(BillScraper):
 
         # get all bills into this dict, fill in action/docs before saving
         self.bills = {}
-        for data in self.access_to_csv('Legislation'):
+        for data in self.chamber_rows('Legislation', chamber_letter):
             # use their BillID for the key but build our own for storage
             bill_key = data['BillID'].replace(' ', '')
 
-            # if this is from the wrong chamber, skip it
-            if not bill_key.startswith(chamber_letter):
-                continue
-
             bill_id = '%s%s%s' % (data['Chamber'], data['LegType'],
                                   data['LegNo'])
             bill_type = bill_type_map[data['LegType']]
@@ -216,6 +247,69 @@ class NMBillScraper(BillScraper):
         for bill in self.bills.itervalues():
             self.save_bill(bill)
 
+        scraped.set((session, chamber), self.mdb_stamp)
+        scraped.save()
+
+    def listing(self, url):
+        """ (filename, bill_id, bill_type, suffix) for each file in one of
+        the session directory listings. Each listing is fetched once per
+        run (both chambers use the shared ones) and kept between runs; it
+        is only downloaded again if the server says it has changed. """
+        if not hasattr(self, 'listings'):
+            self.listings = {}
+            self.listing_cache = DiskCache('nm_listings')
+        if url in self.listings:
+            return self.listings[url]
+
+        headers = {}
+        cached = self.listing_cache.get(url)
+        if cached:
+            etag, last_modified = cached[0]
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        resp = self.get(url, headers=headers)
+        if cached and resp.status_code == 304:
+            entries = cached[1]
+        else:
+            entries = self.parse_listing(resp.text)
+            validators = (resp.headers.get('etag'),
+                          resp.headers.get('last-modified'))
+            if any(validators):
+                self.listing_cache.set(url, (validators, entries))
+                self.listing_cache.save()
+
+        self.listings[url] = entries
+        return entries
+
+    @staticmethod
+    def parse_listing(html):
+        doc = lxml.html.fromstring(html)
+        entries = []
+
+        # all links but first one
+        for fname in doc.xpath('//a/text()')[1:]:
+            # if a COPY continue
+            if re.search('- COPY', fname):
+                continue
+
+            # Delete any errant words found following the file name
+            fname = fname.split(" ")[0]
+
+            # split filename into bill_id format
+            match = re.match('([A-Z]+)0*(\d{1,4})([^.]*)', fname.upper())
+            if match is None:
+                entries.append((fname, None, None, None))
+                continue
+
+            bill_type, bill_num, suffix = match.groups()
+            # adapt to bill_id format
+            bill_id = bill_type.replace('B', '') + bill_num
+            entries.append((fname, bill_id, bill_type, suffix))
+        return entries
+
     def check_other_documents(self, session, chamber):
         """ check for documents that reside in their own directory """
 
@@ -227,18 +321,11 @@ class NMBillScraper(BillScraper):
         # go through all of the links on these pages and add them to the
         # appropriate bills
         def check_docs(url, doc_type):
-            html = self.get(url).text
-            doc = lxml.html.fromstring(html)
-
-            for fname in doc.xpath('//a/text()'):
-                # split filename into bill_id format
-                match = re.match('([A-Z]+)0*(\d{1,4})', fname)
-                if match:
-                    bill_type, bill_num = match.groups()
+            for fname, bill_id, bill_type, suffix in self.listing(url):
+                if bill_id:
                     mimetype = "application/pdf" if fname.lower().endswith("pdf") else "text/html"    
                     
                     if (chamber == "upper" and bill_type[0] == "S") or (chamber == "lower" and bill_type[0] == "H"):
-                        bill_id = bill_type.replace('B', '') + bill_num
                         try:
                             bill = self.bills[bill_id]
                         except KeyError:
@@ -348,12 +435,10 @@ class NMBillScraper(BillScraper):
         # these actions need a committee name spliced in
         actions_with_committee = ('SENT', '7650', '7654')
 
-        for action in self.access_to_csv('Actions'):
+        for action in self.chamber_rows('Actions', chamber_letter):
             bill_key = action['BillID'].replace(' ', '')
 
-            # if this is from the wrong chamber or an unknown bill skip it
-            if not bill_key.startswith(chamber_letter):
-                continue
+            # if this is an unknown bill skip it
             if bill_key not in self.bills:
                 self.warning('action for unknown bill %s' % bill_key)
                 continue
@@ -415,32 +500,15 @@ class NMBillScraper(BillScraper):
         doc_path = 'http://www.nmlegis.gov/Sessions/%s/%s/%s/'
         doc_path = doc_path % (session_path, doctype, chamber_name)
 
-        html = self.get(doc_path).text
-
-        doc = lxml.html.fromstring(html)
-
-        # all links but first one
-        for fname in doc.xpath('//a/text()')[1:]:
-            # if a COPY continue 
-            if re.search('- COPY', fname):
-                continue 
-
-            # Delete any errant words found following the file name
-            fname = fname.split(" ")[0]
-
+        for fname, bill_id, bill_type, suffix in self.listing(doc_path):
             # skip PDFs for now -- everything but votes have HTML versions
             if fname.endswith('pdf') and 'VOTE' not in fname:
                 continue
 
-            match = re.match('([A-Z]+)0*(\d{1,4})([^.]*)', fname.upper())
-            if match is None:
+            if bill_id is None:
                 self.warning("No match, skipping")
                 continue
 
-            bill_type, bill_num, suffix = match.groups()
-
-            # adapt to bill_id format
-            bill_id = bill_type.replace('B', '') + bill_num
             try:
                 bill = self.bills[bill_id]
             except KeyError:
@@ -498,10 +566,8 @@ class NMBillScraper(BillScraper):
         vote = Vote('upper', '?', 'senate passage', False, 0, 0, 0)
         vote.add_source(url)
 
-        fname, resp = self.urlretrieve(url)
         # this gives us the cleaned up text
-        sv_text = convert_sv_text(convert_pdf(fname, 'text'))
-        os.remove(fname)
+        sv_text = convert_sv_text(pdfdata_to_text(self.get(url).content))
         in_votes = False
         flag = None
         overrides = {"ONEILL": "O'NEILL"}
@@ -622,12 +688,10 @@ class NMBillScraper(BillScraper):
         """ house votes are pdfs that can be converted to text, require some
         nasty regex to get votes out reliably """
 
-        fname, resp = self.urlretrieve(url)
-        text = convert_pdf(fname, 'text')
+        text = pdfdata_to_text(self.get(url).content)
         if not text.strip():
             self.warning('image PDF %s' % url)
             return
-        os.remove(fname)
 
         # get date
         if text.strip() == 'NEW MEXICO HOUSE OF REPRESENTATIVES':
@@ -664,18 +728,73 @@ class NMBillScraper(BillScraper):
                     vote.other(name)
         return vote
 
+    def fingerprint(self, url):
+        """ identify a document without downloading it if we can: by its
+        URL and ETag (with Content-Length and Last-Modified), or failing
+        that by a hash of its content. None if it doesn't exist; if it
+        can't be reached, a fingerprint of its own (so it's kept) that
+        isn't cached.
+        """
+        try:
+            resp = self.head(url)
+            headers = resp.headers
+            # a size and date alone could match another document, and an
+            # ETag only means something for its own URL (IIS derives them
+            # from the file's mtime)
+            if headers.get('etag'):
+                return url, ('etag', url, headers.get('etag'),
+                             headers.get('content-length'),
+                             headers.get('last-modified'))
+
+            resp = self.get(url, stream=True)
+            content_hash = hashlib.sha1()
+            for chunk in resp.iter_content(64 * 1024):
+                content_hash.update(chunk)
+            return url, ('sha1', content_hash.hexdigest())
+        except scrapelib.HTTPError:
+            return url, None
+        except requests.exceptions.RequestException as e:
+            self.warning('could not check %s, keeping it: %s' % (url, e))
+            return url, ('unchecked', url)
+
     def dedupe_docs(self):
-        for bill_id, bill in self.bills.items():
-            documents = bill['documents']
-            if 1 < len(documents):
-                resp_set = set()
-                for doc in documents:
-                    try:
-                        resp = self.head(doc['url'])
-                    except scrapelib.HTTPError:
-                        documents.remove(doc)
-                        continue
-                    if resp in resp_set:
-                        documents.remove(doc)
-                    else:
-                        resp_set.add(resp)
+        """ drop documents that can't be fetched or that duplicate another
+        of the bill's documents """
+        fingerprints = DiskCache('nm_doc_fingerprints',
+                                 expires=NM_FINGERPRINT_DAYS * 24 * 60 * 60)
+
+        bills = [bill for bill in self.bills.itervalues()
+                 if 1 < len(bill['documents'])]
+        urls = set(doc['url'] for bill in bills for doc in bill['documents'])
+        found = {}
+        for url in urls:
+            fp = fingerprints.get(url)
+            # (older entries could be bare size/date matches, or ETags
+            # without their URL; redo them)
+            if fp and (fp[0] == 'sha1' or fp[0] == 'etag' and fp[1] == url):
+                found[url] = fp
+            else:
+                found[url] = None
+        probe = [url for url in urls if found[url] is None]
+
+        pool = ThreadPool(NM_HEAD_REQUESTS)
+        try:
+            for url, fp in pool.imap_unordered(self.fingerprint, probe):
+                found[url] = fp
+                if fp is not None and fp[0] != 'unchecked':
+                    fingerprints.set(url, fp)
+        finally:
+            pool.terminate()
+        fingerprints.save()
+        self.info('%d documents fingerprinted, %d of them cached' % (
+            len(urls), len(urls) - len(probe)))
+
+        for bill in bills:
+            seen = set()
+            documents = []
+            for doc in bill['documents']:
+                fp = found[doc['url']]
+                if fp is not None and fp not in seen:
+                    seen.add(fp)
+                    documents.append(doc)
+            bill['documents'] = documents
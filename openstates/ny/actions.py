@@ -3,7 +3,8 @@ NY needs an @after_categorize function to expand committee names
 and help the importer figure out which committees are being mentioned.
 '''
 import re
-from functools import partial
+import sre_parse
+import sre_constants
 from collections import namedtuple, defaultdict
 from types import MethodType
 
@@ -36,6 +37,63 @@ class Rule(namedtuple('Rule', 'regexes types stop attrs')):
         return tuple.__new__(_cls, (regexes, types, stop, kwargs))
 
 
+def _whitespace(regex):
+    '''Loosen runs of literal whitespace in a rule regex so that
+    action text with odd spacing still matches.
+    '''
+    return re.sub(r'\s{1,4}', r'\\s{,4}', regex)
+
+
+def _required_literal(compiled):
+    '''Return the longest run of literal characters that any match
+    of ``compiled`` must contain, or None if there isn't one. Only
+    top-level literals are considered, so the substring is genuinely
+    required and can be used to skip the regex without searching.
+    '''
+    best = current = ''
+    for op, av in sre_parse.parse(compiled.pattern):
+        if op == sre_constants.LITERAL and av < 128:
+            current += chr(av)
+        else:
+            current = ''
+        if len(current) > len(best):
+            best = current
+    if not best:
+        return None
+    if compiled.flags & re.IGNORECASE:
+        best = best.lower()
+    return best
+
+
+class CompiledRule(namedtuple('CompiledRule', 'rule regexes')):
+    '''A Rule whose regexes have been whitespace-loosened and compiled.
+    ``regexes`` is a sequence of (compiled, literal, ignorecase) triples,
+    where ``literal`` is a required substring used as a prefilter.
+    '''
+    @classmethod
+    def from_rule(cls, rule):
+        regexes = []
+        for regex in sorted(rule.regexes):
+            compiled = re.compile(_whitespace(regex))
+            ignorecase = bool(compiled.flags & re.IGNORECASE)
+            regexes.append((compiled, _required_literal(compiled),
+                            ignorecase))
+        return cls(rule, tuple(regexes))
+
+
+def compile_rules(rules):
+    return tuple(CompiledRule.from_rule(rule) for rule in rules)
+
+
+class CategorizerMeta(type):
+    '''Compiles a categorizer's rules once, when the class is created,
+    so categorize never has to rewrite or recompile a regex.
+    '''
+    def __init__(cls, name, bases, attrs):
+        super(CategorizerMeta, cls).__init__(name, bases, attrs)
+        cls._compiled_rules = compile_rules(cls.rules)
+
+
 class BaseCategorizer(object):
     '''A class that exposes a main categorizer function
     and before and after hooks, in case a state requires specific
@@ -43,6 +101,7 @@ class BaseCategorizer(object):
     value is a 2-tuple of category types and a dictionary of
     attributes to overwrite on the target action object.
     '''
+    __metaclass__ = CategorizerMeta
     rules = []
 
     def __init__(self):
@@ -62,36 +121,46 @@ class BaseCategorizer(object):
 
     def categorize(self, text):
 
-        whitespace = partial(re.sub, '\s{1,4}', '\s{,4}')
-
         # Run the before hook.
         text = self.before_categorize(text)
         for func in self._before_funcs:
             text = func(text)
 
+        # Case-insensitive rules are prefiltered against this.
+        lowered = text.lower()
+
         types = set()
         attrs = defaultdict(set)
-        for rule in self.rules:
+        for rule, regexes in self._compiled_rules:
+
+            matched = False
+            for regex, literal, ignorecase in regexes:
 
-            for regex in rule.regexes:
+                # Skip the search if a required substring is missing.
+                if literal is not None:
+                    if literal not in (lowered if ignorecase else text):
+                        continue
 
                 # Try to match the regex.
-                m = re.search(whitespace(regex), text)
-                if m or (regex in text):
-                    # If so, apply its associated types to this action.
-                    types |= rule.types
-
-                    # Also add its specified attrs.
-                    for k, v in m.groupdict().items():
-                        attrs[k].add(v)
-
-                    for k, v in rule.attrs.items():
-                        attrs[k].add(v)
-
-                    # Break if the rule says so, otherwise
-                    # continue testing against other rules.
-                    if rule.stop is True:
-                        break
+                m = regex.search(text)
+                if m is None:
+                    continue
+                matched = True
+
+                # If so, apply its associated types to this action.
+                types |= rule.types
+
+                # Also add its specified attrs.
+                for k, v in m.groupdict().items():
+                    attrs[k].add(v)
+
+                for k, v in rule.attrs.items():
+                    attrs[k].add(v)
+
+            # Stop if the rule says so, otherwise
+            # continue testing against other rules.
+            if matched and rule.stop is True:
+                break
 
         # Returns types, attrs
         return_val = (list(types), attrs)
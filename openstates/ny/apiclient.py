@@ -1,17 +1,38 @@
 import string
 import os
-import time
-import requests
 import urlparse
 import functools
-from collections import defaultdict
+import itertools
+from collections import defaultdict, deque
+from multiprocessing.pool import ThreadPool
 from OpenSSL.SSL import SysCallError
 
+import requests
+from billy.core import settings
+from openstates.utils import RateLimitedSession, rate_limiter
+
+
+# How many API requests may be outstanding at once when fetching pages.
+NY_API_MAX_IN_FLIGHT = getattr(settings, 'NY_API_MAX_IN_FLIGHT', 4)
+NY_API_MAX_IN_FLIGHT = int(os.environ.get('NY_API_MAX_IN_FLIGHT',
+                                          NY_API_MAX_IN_FLIGHT))
+
+# Request budget for the Open Legislation API host, shared by all workers.
+NY_API_REQUESTS_PER_SECOND = getattr(settings, 'NY_API_REQUESTS_PER_SECOND',
+                                     4)
+NY_API_REQUESTS_PER_SECOND = float(os.environ.get(
+    'NY_API_REQUESTS_PER_SECOND', NY_API_REQUESTS_PER_SECOND))
+
+# Seconds to wait on a single API request before trying it again.
+NY_API_TIMEOUT = getattr(settings, 'NY_API_TIMEOUT', 60)
+NY_API_TIMEOUT = int(os.environ.get('NY_API_TIMEOUT', NY_API_TIMEOUT))
+
 
 class BadAPIResponse(Exception):
     """
     Raised if the service returns a service code higher than 400,
-    other than 429. Makes the response object avaible as exc.resp.
+    including a 429 that outlasted the rate limiter's retries. Makes the
+    response object available as exc.resp.
     """
     def __init__(self, resp, *args):
         super(BadAPIResponse, self).__init__(self, *args)
@@ -20,8 +41,9 @@ class BadAPIResponse(Exception):
 
 def check_response(method):
     """
-    Decorated functions will run, and if they come back with a 429
-    and retry-after header, will wait and try again.
+    Decorated functions will run and have their response decoded from
+    JSON. 429s are retried by the rate limiter, so any error
+    status that gets this far is raised as a BadAPIResponse.
     """
     @functools.wraps(method)
     def wrapped(self, *args, **kwargs):
@@ -29,9 +51,6 @@ def check_response(method):
         status = response.status_code
 
         if status >= 400:
-            if response.status_code == 429:
-                self.handle_429(resp, *args, **kwargs)
-                return method(self, *args, **kwargs).json()
             msg_args = (response, response.text, response.headers)
             msg = 'Bad api response: %r %r %r' % msg_args
             raise BadAPIResponse(response, msg)
@@ -55,7 +74,9 @@ class OpenLegislationAPIClient(object):
             'bills/{session_year}/{bill_id}?summary={summary}&detail='
             '{detail}'),
         bill_updates='bills/{session_year}/{bill_id}/updates?',
-        updated_bills='bills/updates/{from_datetime}/{to_datetime}?',
+        updated_bills=(
+            'bills/updates/{from_datetime}/{to_datetime}?limit={limit}'
+            '&offset={offset}'),
         committees=(
             'committees/{session_year}/{chamber}?full={full}'),
         committee='committees/{session_year}/{chamber}/{committee_name}?',
@@ -84,9 +105,24 @@ class OpenLegislationAPIClient(object):
 
         return url
 
-    def __init__(self, scraper):
+    def __init__(self, scraper, max_in_flight=NY_API_MAX_IN_FLIGHT):
         self.scraper = scraper
         self.api_key = os.environ['NEW_YORK_API_KEY']
+        self.max_in_flight = max_in_flight
+
+        # API requests bypass the scraper: its throttle (requests_per_minute)
+        # and retries aren't thread-safe and would cap every worker at the
+        # scraper's pace. The session's limiter is the only pacer instead,
+        # with one budget shared by all workers. The API asks clients to
+        # honor Retry-After on 429s; the limiter does, and holds back the
+        # other workers while it waits.
+        rate_limiter.set_budget(urlparse.urlparse(self.root).netloc,
+                                NY_API_REQUESTS_PER_SECOND,
+                                burst=max_in_flight)
+        self.session = RateLimitedSession(rate_limiter)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
     @check_response
     def get(self, resource_name, requests_args=None,
@@ -97,6 +133,7 @@ class OpenLegislationAPIClient(object):
         requests_args = requests_args or ()
         requests_kwargs = requests_kwargs or {}
         requests_kwargs.update(verify=False)
+        requests_kwargs.setdefault('timeout', NY_API_TIMEOUT)
         headers = requests_kwargs.get('headers', {})
         headers['Accept'] = "application/json"
         requests_kwargs['headers'] = headers
@@ -107,12 +144,17 @@ class OpenLegislationAPIClient(object):
         tries = 0
         while response is None and tries <  num_bad_packets_allowed:
             try:
-                response = self.scraper.get(url, *requests_args,
-                    **requests_kwargs)
+                response = self.session.get(url, *requests_args,
+                                            **requests_kwargs)
             except SysCallError as e:
                 err, string = e.args
                 if err != 104:
                     raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # the scraper used to retry these for us
+                err, string = None, e
+                self.scraper.warning('API GET failed: %r' % e)
+            if response is None:
                 tries += 1
                 if tries >= num_bad_packets_allowed:
                     print err, string
@@ -120,6 +162,51 @@ class OpenLegislationAPIClient(object):
 
         return response
 
+    def get_pages(self, resource_name, limit=1000, **url_format_args):
+        """
+        Yields the items of every page of a paginated resource, in order.
+        The first page is fetched on its own to learn the total; the
+        remaining offsets are then fetched concurrently, with at most
+        max_in_flight pages fetched ahead of the one being read.
+        """
+        def get_page(offset):
+            return self.get(resource_name, limit=limit, offset=offset,
+                            **url_format_args)
+
+        response = get_page(1)
+        if response['responseType'] == 'empty list':
+            return
+        for item in response['result']['items']:
+            yield item
+
+        offsets = range(1 + limit, response['total'] + 1, limit)
+        for response in self.imap(get_page, offsets):
+            for item in response['result']['items']:
+                yield item
+
+    def imap(self, func, args):
+        """
+        Yields func(arg) for each of the list args, in order, calling func
+        from up to max_in_flight threads, with at most max_in_flight
+        results fetched ahead of the one being read.
+        """
+        if not args:
+            return
+
+        pool = ThreadPool(min(self.max_in_flight, len(args)))
+        try:
+            args = iter(args)
+            pending = deque(
+                pool.apply_async(func, (arg,)) for arg in
+                itertools.islice(args, self.max_in_flight))
+            while pending:
+                result = pending.popleft().get()
+                for arg in itertools.islice(args, 1):
+                    pending.append(pool.apply_async(func, (arg,)))
+                yield result
+        finally:
+            pool.terminate()
+
     def unpaginate(self, result):
         for data in result['items']:
             yield data
@@ -134,18 +221,3 @@ class OpenLegislationAPIClient(object):
                     yield data
             else:
                 return
-
-    def handle_429(self, resp, *args, **kwargs):
-        """
-        According to the docs:
-
-        'If the rate limit is exceeded, we will respond with a HTTP 429 Too Many
-        Requests response code and a body that details the reason for the rate
-        limiter kicking in. Further, the response will have a Retry-After
-        header that tells you for how many seconds to sleep before retrying.
-        You should anticipate this in your API client for the smoothest user
-        experience.'
-        """
-        seconds = int(resp.headers['retry-after'])
-        self.scraper.info('Got a 429: Sleeping %s seconds per retry-after header.' % seconds)
-        time.sleep(seconds)
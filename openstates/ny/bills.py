@@ -1,20 +1,28 @@
 import re
 import datetime
+import pytz
 import scrapelib
 import lxml.html
 import lxml.etree
-from collections import defaultdict
+from billy.core import settings
 from billy.utils import term_for_session
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 from apiclient import OpenLegislationAPIClient
 from .models import AssemblyBillPage
 from .actions import Categorizer
+from openstates.utils import (CachedCategorizer, DiskCache, env_flag,
+                              rate_limiter)
+
+# In incremental mode only bills the API reports as updated since the
+# last successful scrape of the session are re-fetched.
+NY_INCREMENTAL = getattr(settings, 'NY_INCREMENTAL', False)
+NY_INCREMENTAL = env_flag('NY_INCREMENTAL', NY_INCREMENTAL)
 
 
 class NYBillScraper(BillScraper):
     jurisdiction = 'ny'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
 
     def _parse_bill_number(self, bill_id):
         bill_id_regex = r'(^[ABCEJKLRS])(\d{,6})'
@@ -132,34 +140,45 @@ class NYBillScraper(BillScraper):
 
     def _generate_bills(self, session):
         self.logger.info('Generating bills.')
-        bills = defaultdict(list)
 
         delimiter = '-'
         (start_year, delimiter, end_year) = session.partition(delimiter)
-        page = 0
         # 1000 is the current maximum returned record limit for all Open
         # Legislature API calls that use the parameter.
         limit = 1000
         # Flag whether to retrieve full bill data.
         full = True
-        while True:
-            # Updating the offset before the page matters here.
-            offset = limit * page + 1
-            page += 1
-
-            # Response should be a dict of the JSON data returned from
-            # the Open Legislation API.
-            response = self.api_client.get('bills', session_year=start_year,
-                limit=limit, offset=offset, full=full)
-
-            if response['responseType'] == 'empty list'\
-                or response['offsetStart'] > response['offsetEnd']:
-                break
-            else:
-                bills = response['result']['items']
 
-            for bill in bills:
-                yield bill
+        return self.api_client.get_pages('bills', limit=limit,
+            session_year=start_year, full=full)
+
+    def _api_now(self):
+        # The API's update times are the Capitol's wall-clock time, to the
+        # second.
+        timezone = pytz.timezone(self.metadata['capitol_timezone'])
+        return datetime.datetime.now(timezone).strftime('%Y-%m-%dT%H:%M:%S')
+
+    def _generate_updated_bills(self, session, since, to_datetime):
+        self.logger.info('Generating bills updated since %s.' % since)
+
+        delimiter = '-'
+        (start_year, delimiter, end_year) = session.partition(delimiter)
+
+        bill_ids = set()
+        for update in self.api_client.get_pages('updated_bills', limit=1000,
+                from_datetime=since, to_datetime=to_datetime):
+            bill_id = update['id']
+            if str(bill_id['session']) == start_year:
+                bill_ids.add(bill_id['basePrintNo'])
+
+        self.logger.info('%d bills updated.' % len(bill_ids))
+
+        def get_bill(bill_id):
+            return self.api_client.get('bill', session_year=start_year,
+                bill_id=bill_id)
+
+        for response in self.api_client.imap(get_bill, sorted(bill_ids)):
+            yield response['result']
 
     def _scrape_bill(self, session, bill_data):
         details = self._parse_bill_details(bill_data)
@@ -296,6 +315,25 @@ class NYBillScraper(BillScraper):
                 self.term_start_year = term['start_year']
                 break
 
-        for bill in self._generate_bills(session):
+        started = self._api_now()
+        if NY_INCREMENTAL:
+            last_runs = DiskCache('ny_bill_updates')
+            since = last_runs.get(session)
+        else:
+            since = None
+
+        if since:
+            bills = self._generate_updated_bills(session, since, started)
+        else:
+            bills = self._generate_bills(session)
+
+        for bill in bills:
             bill_object = self._scrape_bill(session, bill)
             self.save_bill(bill_object)
+
+        if NY_INCREMENTAL:
+            last_runs.set(session, started)
+            last_runs.save()
+
+        self.info('API requests: %(requests)d, retries: %(retries)d, '
+                  'throttled for %(wait_seconds).1fs' % rate_limiter.stats())
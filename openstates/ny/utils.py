@@ -2,6 +2,8 @@ import collections
 
 import lxml.html
 
+from openstates.utils.pdf import convert_pdf
+
 
 class CachedAttr(object):
     '''Computes attribute value and caches it in instance.
@@ -1,7 +1,12 @@
 import os
+import urllib
+import urlparse
 import datetime
+import collections
 from operator import itemgetter
+from multiprocessing.pool import ThreadPool
 
+from billy.core import settings
 from billy.scrape import ScrapeError
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
@@ -11,6 +16,53 @@ import scrapelib
 import lxml.html
 
 
+#how many pages of api results to fetch ahead of the one we're reading
+OH_PAGES_AHEAD = getattr(settings, 'OH_PAGES_AHEAD', 4)
+OH_PAGES_AHEAD = int(os.environ.get('OH_PAGES_AHEAD', OH_PAGES_AHEAD))
+
+#documents the api lists per session, which we match to bills ourselves
+BULK_SOURCES = ("amendments","fiscals","synopsiss","analysiss")
+
+
+def split_link(link):
+    path, _, query = link.partition("?")
+    return path, urlparse.parse_qsl(query, keep_blank_values=True)
+
+
+def same_link(a, b):
+    path_a, query_a = split_link(a)
+    path_b, query_b = split_link(b)
+    return path_a == path_b and sorted(query_a) == sorted(query_b)
+
+
+def link_counter(first, second):
+    #if two consecutive nextLinks only differ in one number (a page
+    #number or an offset), returns a function that makes the link after
+    #a given one, otherwise None
+    path, first_query = split_link(first)
+    second_path, second_query = split_link(second)
+    if path != second_path or len(first_query) != len(second_query):
+        return None
+    changed = [i for i, (a, b) in enumerate(zip(first_query, second_query))
+               if a != b]
+    if len(changed) != 1:
+        return None
+    i = changed[0]
+    (key, a), (other_key, b) = first_query[i], second_query[i]
+    if key != other_key or not (a.isdigit() and b.isdigit()):
+        return None
+    step = int(b) - int(a)
+    if step <= 0:
+        return None
+
+    def advance(link):
+        path, query = split_link(link)
+        query = [(k, str(int(v) + step) if k == key else v)
+                 for k, v in query]
+        return path + "?" + urllib.urlencode(query)
+    return advance
+
+
 class OHBillScraper(BillScraper):
     jurisdiction = 'oh'
 
@@ -79,10 +131,11 @@ class OHBillScraper(BillScraper):
             base_url = "http://search-prod.lis.state.oh.us"
             first_page = base_url + "/solarapi/v1/general_assembly_{session}/".format(session=session)
             legislators = self.get_legislator_ids(first_page)
-            all_amendments = self.get_other_data_source(first_page,base_url,"amendments")
-            all_fiscals = self.get_other_data_source(first_page,base_url,"fiscals")
-            all_synopsis = self.get_other_data_source(first_page,base_url,"synopsiss")
-            all_analysis = self.get_other_data_source(first_page,base_url,"analysiss")
+            bulk = self.bulk_documents(first_page,base_url)
+            all_amendments = bulk["amendments"]
+            all_fiscals = bulk["fiscals"]
+            all_synopsis = bulk["synopsiss"]
+            all_analysis = bulk["analysiss"]
             doc_types = ["bills","resolutions"]
             for doc_type in doc_types:
                 bill_versions = {}
@@ -255,13 +308,49 @@ class OHBillScraper(BillScraper):
 
                     self.save_bill(bill)
 
+    def get_page(self, url):
+        return self.get(url).json()
+
     def pages(self,base_url, first_page):
-        page = self.get(first_page)
-        page = page.json()
+        page = self.get_page(first_page)
+        yield page
+        if "nextLink" not in page:
+            return
+        link = page["nextLink"]
+        page = self.get_page(base_url+link)
         yield page
+
+        #if the first two nextLinks only differ by a counter, we can
+        #guess the links ahead of time and fetch a few pages early
+        advance = "nextLink" in page and link_counter(link, page["nextLink"])
+        if not advance:
+            while "nextLink" in page:
+                page = self.get_page(base_url+page["nextLink"])
+                yield page
+            return
+
+        pool = ThreadPool(OH_PAGES_AHEAD)
+        try:
+            pending = collections.deque()
+            guess = page["nextLink"]
+            while True:
+                while len(pending) < OH_PAGES_AHEAD:
+                    pending.append((guess, pool.apply_async(
+                        self.get_page, (base_url+guess,))))
+                    guess = advance(guess)
+                expected, result = pending.popleft()
+                if not same_link(expected, page["nextLink"]):
+                    break
+                page = result.get()
+                yield page
+                if "nextLink" not in page:
+                    return
+        finally:
+            pool.terminate()
+
+        #the links stopped following the pattern, follow them one by one
         while "nextLink" in page:
-            page = self.get(base_url+page["nextLink"])
-            page = page.json()
+            page = self.get_page(base_url+page["nextLink"])
             yield page
 
 
@@ -285,6 +374,25 @@ class OHBillScraper(BillScraper):
 
 
 
+    def bulk_documents(self,first_page,base_url):
+        #all four bulk sources for a session, fetched side by side and
+        #kept for as long as the scraper is, so the session's bills (in
+        #either chamber, and if we're asked for the session again) only
+        #cost us one pass over them
+        if not hasattr(self, "_bulk_documents"):
+            self._bulk_documents = {}
+        if first_page not in self._bulk_documents:
+            pool = ThreadPool(len(BULK_SOURCES))
+            try:
+                sources = pool.map(
+                    lambda name: self.get_other_data_source(
+                        first_page,base_url,name),
+                    BULK_SOURCES)
+            finally:
+                pool.terminate()
+            self._bulk_documents[first_page] = dict(zip(BULK_SOURCES,sources))
+        return self._bulk_documents[first_page]
+
     def add_document(self,documents,bill_id,type_of_document,bill,base_url):
         try:
             documents = documents[bill_id]
@@ -5,7 +5,7 @@ import re
 import pytz
 
 from billy.scrape.events import EventScraper, Event
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 
 
 class OHEventScraper(EventScraper):
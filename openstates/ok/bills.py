@@ -11,6 +11,7 @@ import lxml.html
 import scrapelib
 
 from .actions import Categorizer
+from openstates.utils import CachedCategorizer
 
 
 class OKBillScraper(BillScraper):
@@ -19,7 +20,7 @@ class OKBillScraper(BillScraper):
     bill_types = ['B', 'JR', 'CR', 'R']
     subject_map = collections.defaultdict(list)
 
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
 
     def scrape(self, chamber, session, only_bills=None):
         # start by building subject map
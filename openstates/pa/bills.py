@@ -11,11 +11,12 @@ import lxml.html
 import urlparse
 
 from .actions import Categorizer
+from openstates.utils import CachedCategorizer
 
 
 class PABillScraper(BillScraper):
     jurisdiction = 'pa'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
 
     def scrape(self, chamber, session):
         self.validate_session(session)
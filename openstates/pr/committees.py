@@ -2,7 +2,7 @@
 import re
 import os
 from billy.scrape.committees import CommitteeScraper, Committee
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 from openstates.utils import LXMLMixin
 
 
@@ -1,6 +1,7 @@
 import datetime
 from billy.scrape.utils import url_xpath
-from billy.utils.fulltext import pdfdata_to_text, text_after_line_numbers
+from billy.utils.fulltext import text_after_line_numbers
+from openstates.utils.pdf import pdfdata_to_text
 from .bills import RIBillScraper
 from .legislators import RILegislatorScraper
 from .committees import RICommitteeScraper
@@ -1,11 +1,26 @@
+import os
 import datetime
-import ftplib
 import re
-import time
 import xml.etree.cElementTree as etree
+from multiprocessing.pool import ThreadPool
 
+from billy.core import settings
 from billy.scrape import ScrapeError
 from billy.scrape.bills import BillScraper, Bill
+from openstates.utils import DiskCache, env_flag
+from .ftp import FTPCrawler
+from .utils import BillDocumentIndex, normalize_bill_id
+
+
+# Number of FTP connections (and threads) used to crawl and fetch files.
+TX_FTP_CONNECTIONS = getattr(settings, 'TX_FTP_CONNECTIONS', 4)
+TX_FTP_CONNECTIONS = int(os.environ.get('TX_FTP_CONNECTIONS',
+                                        TX_FTP_CONNECTIONS))
+
+# In incremental mode directories whose mtime hasn't changed aren't
+# listed again, and bills none of whose files changed aren't re-scraped.
+TX_INCREMENTAL = getattr(settings, 'TX_INCREMENTAL', False)
+TX_INCREMENTAL = env_flag('TX_INCREMENTAL', TX_INCREMENTAL)
 
 
 class TXBillScraper(BillScraper):
@@ -20,36 +35,10 @@ class TXBillScraper(BillScraper):
         'F': 'Enrolled'
     }
 
-    def _get_ftp_files(self, root, dir_):
+    def _get_ftp_files(self, dir_):
         ''' Recursively traverse an FTP directory, returning all files '''
-
-        for i in range(3):
-            try:
-                ftp = ftplib.FTP(root)
-                break
-            except (EOFError, ftplib.error_temp):
-                time.sleep(2 ** i)
-        else:
-            raise
-        ftp.login()
-        ftp.cwd('/' + dir_)
         self.log('Searching an FTP folder for files ({})'.format(dir_))
-
-        lines = []
-        ftp.retrlines('LIST', lines.append)
-        for line in lines:
-            (_date, _time, is_dir, _file_size, name) = re.search(r'''(?x)
-                    ^(\d{2}-\d{2}-\d{2})\s+  # Date in mm-dd-yy
-                    (\d{2}:\d{2}[AP]M)\s+  # Time in hh:mmAM/PM
-                    (<DIR>)?\s+  # Directories will have an indicating flag
-                    (\d+)?\s+  # Files will have their size in bytes
-                    (.+?)\s*$  # Directory or file name is the remaining text
-                    ''', line).groups()
-            if is_dir:
-                for item in self._get_ftp_files(root, '/'.join([dir_, name])):
-                    yield item
-            else:
-                yield '/'.join(['ftp://' + root, dir_, name])
+        return self.crawler.walk(dir_)
 
     def scrape(self, session, chambers):
         self.validate_session(session)
@@ -59,54 +48,50 @@ class TXBillScraper(BillScraper):
             session_code = session_code + 'R'
         assert len(session_code) == 3, "Unable to handle the session name"
 
-        self.versions = []
-        version_files = self._get_ftp_files(self._FTP_ROOT,
-                                            'bills/{}/billtext/html'.
-                                            format(session_code))
-        for item in version_files:
-            bill_id = item.split('/')[-1].split('.')[0]
-            bill_id = ' '.join(re.search(r'([A-Z]{2})R?0+(\d+)',
-                               bill_id).groups())
-            self.versions.append((bill_id, item))
-
-        self.analyses = []
-        analysis_files = self._get_ftp_files(self._FTP_ROOT,
-                                             'bills/{}/analysis/html'.
-                                             format(session_code))
-        for item in analysis_files:
-            bill_id = item.split('/')[-1].split('.')[0]
-            bill_id = ' '.join(re.search(r'([A-Z]{2})R?0+(\d+)',
-                               bill_id).groups())
-            self.analyses.append((bill_id, item))
-
-        self.fiscal_notes = []
-        fiscal_note_files = self._get_ftp_files(self._FTP_ROOT,
-                                                'bills/{}/fiscalnotes/html'.
-                                                format(session_code))
-        for item in fiscal_note_files:
-            bill_id = item.split('/')[-1].split('.')[0]
-            bill_id = ' '.join(re.search(r'([A-Z]{2})R?0+(\d+)',
-                               bill_id).groups())
-            self.fiscal_notes.append((bill_id, item))
-
-        self.witnesses = []
-        witness_files = self._get_ftp_files(self._FTP_ROOT,
-                                            'bills/{}/witlistbill/html'.
-                                            format(session_code))
-        for item in witness_files:
-            bill_id = item.split('/')[-1].split('.')[0]
-            bill_id = ' '.join(re.search(r'([A-Z]{2})R?0+(\d+)',
-                               bill_id).groups())
-            self.witnesses.append((bill_id, item))
-
-        history_files = self._get_ftp_files(self._FTP_ROOT,
-                                            'bills/{}/billhistory'.
-                                            format(session_code))
-        for bill_url in history_files:
-            self.scrape_bill(session, bill_url)
-
-    def scrape_bill(self, session, history_url):
-        history_xml = self.get(history_url).text.encode('ascii', 'ignore')
+        self.crawler = FTPCrawler(self._FTP_ROOT, TX_FTP_CONNECTIONS,
+                                  cache=DiskCache('tx_ftp_listings'),
+                                  trust_dir_mtimes=TX_INCREMENTAL)
+
+        try:
+            self.log('Indexing bill documents for {}'.format(session_code))
+            # Built afresh each run, from the crawler's current listings,
+            # so new documents and the changed flags are never stale.
+            self.documents = BillDocumentIndex.build(self.crawler,
+                                                     session_code)
+
+            history_files = self._get_ftp_files(
+                'bills/{}/billhistory'.format(session_code))
+            if TX_INCREMENTAL:
+                history_files = [item for item in history_files
+                                 if self._bill_changed(item)]
+
+            # Histories are fetched over the pooled connections while
+            # earlier ones are being parsed.
+            pool = ThreadPool(TX_FTP_CONNECTIONS)
+            try:
+                fetched = pool.imap(
+                    lambda item: (item.url, self.crawler.read(item.path)),
+                    history_files)
+                for bill_url, history_xml in fetched:
+                    self.scrape_bill(session, bill_url, history_xml)
+            finally:
+                pool.terminate()
+
+            # Only remember what was seen once everything was scraped.
+            self.crawler.save()
+        finally:
+            self.crawler.close()
+
+    def _bill_changed(self, history_file):
+        if history_file.changed:
+            return True
+        bill_id = normalize_bill_id(history_file.path)
+        return bill_id is None or bill_id in self.documents.changed
+
+    def scrape_bill(self, session, history_url, history_xml=None):
+        if history_xml is None:
+            history_xml = self.get(history_url).content
+        history_xml = history_xml.decode('ascii', 'ignore').encode('ascii')
         root = etree.fromstring(history_xml)
 
         bill_title = root.findtext("caption")
@@ -137,37 +122,37 @@ class TXBillScraper(BillScraper):
         for subject in root.iterfind('subjects/subject'):
             bill['subjects'].append(subject.text.strip())
 
-        versions = [x for x in self.versions if x[0] == bill_id]
+        versions = self.documents.get(bill_id, 'versions')
         for version in versions:
             bill.add_version(
-                name=self.NAME_SLUGS[version[1][-5]],
-                url=version[1],
+                name=self.NAME_SLUGS[version[-5]],
+                url=version,
                 mimetype='text/html'
             )
 
-        analyses = [x for x in self.analyses if x[0] == bill_id]
+        analyses = self.documents.get(bill_id, 'analyses')
         for analysis in analyses:
             bill.add_document(
-                name="Analysis ({})".format(self.NAME_SLUGS[analysis[1][-5]]),
-                url=analysis[1],
+                name="Analysis ({})".format(self.NAME_SLUGS[analysis[-5]]),
+                url=analysis,
                 mimetype='text/html'
             )
 
-        fiscal_notes = [x for x in self.fiscal_notes if x[0] == bill_id]
+        fiscal_notes = self.documents.get(bill_id, 'fiscal_notes')
         for fiscal_note in fiscal_notes:
             bill.add_document(
                 name="Fiscal Note ({})".format(self.NAME_SLUGS
-                                               [fiscal_note[1][-5]]),
-                url=fiscal_note[1],
+                                               [fiscal_note[-5]]),
+                url=fiscal_note,
                 mimetype='text/html'
             )
 
-        witnesses = [x for x in self.witnesses if x[0] == bill_id]
+        witnesses = self.documents.get(bill_id, 'witnesses')
         for witness in witnesses:
             bill.add_document(
                 name="Witness List ({})".format(self.NAME_SLUGS
-                                                [witness[1][-5]]),
-                url=witness[1],
+                                                [witness[-5]]),
+                url=witness,
                 mimetype='text/html'
             )
 
@@ -0,0 +1,163 @@
+'''
+A crawler for the Texas Legislature's FTP site that reuses a small pool of
+logged-in connections, lists directories in parallel, and remembers what
+it saw so later runs can tell which files changed.
+'''
+import time
+import Queue
+import ftplib
+import threading
+import contextlib
+from io import BytesIO
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from .utils import parse_ftp_listing
+
+
+FTPFile = namedtuple('FTPFile', 'url path mtime size changed')
+
+
+class FTPPool(object):
+    '''Up to `size` logged-in connections to `host`, handed out one
+    caller at a time.
+    '''
+
+    def __init__(self, host, size=4):
+        self.host = host
+        self.size = size
+        self._idle = Queue.Queue()
+        self._slots = threading.Semaphore(size)
+
+    def _connect(self):
+        for i in range(3):
+            try:
+                ftp = ftplib.FTP(self.host)
+                break
+            except (EOFError, ftplib.error_temp):
+                time.sleep(2 ** i)
+        else:
+            raise
+        ftp.login()
+        return ftp
+
+    @contextlib.contextmanager
+    def connection(self):
+        # A slot is held for as long as the connection is in use, and
+        # given back however that ends.
+        self._slots.acquire()
+        try:
+            try:
+                ftp = self._idle.get_nowait()
+            except Queue.Empty:
+                ftp = self._connect()
+
+            try:
+                yield ftp
+            except:
+                # The connection may be in any state; drop it.
+                try:
+                    ftp.close()
+                except ftplib.all_errors:
+                    pass
+                raise
+            self._idle.put(ftp)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                ftp = self._idle.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                ftp.quit()
+            except ftplib.all_errors:
+                ftp.close()
+
+
+class FTPCrawler(object):
+    '''Walks FTP directory trees using a FTPPool.
+
+    Directory listings are kept in `cache` (a DiskCache) and each file
+    found is flagged as changed if its mtime or size differs from the
+    previous listing. With `trust_dir_mtimes`, a directory whose own
+    mtime hasn't moved isn't listed again at all; that saves most LIST
+    calls, but misses files overwritten in place on servers that don't
+    bump the directory's mtime when that happens.
+
+    Nothing is persisted until save() is called, so a failed run is
+    simply crawled again.
+    '''
+
+    def __init__(self, host, pool_size=4, cache=None,
+                 trust_dir_mtimes=False):
+        self.host = host
+        self.pool = FTPPool(host, pool_size)
+        self.pool_size = pool_size
+        self.cache = cache
+        self.trust_dir_mtimes = trust_dir_mtimes
+
+    def list_dir(self, path):
+        with self.pool.connection() as ftp:
+            ftp.cwd('/' + path)
+            lines = []
+            ftp.retrlines('LIST', lines.append)
+        return list(parse_ftp_listing(lines, details=True))
+
+    def _list(self, item):
+        path, mtime = item
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.get(('dir', path))
+        if cached and self.trust_dir_mtimes and mtime is not None \
+                and cached[0] == mtime:
+            return path, cached[1], cached[1]
+
+        entries = self.list_dir(path)
+        if self.cache is not None:
+            self.cache.set(('dir', path), (mtime, entries))
+        return path, entries, cached[1] if cached else []
+
+    def walk(self, root):
+        '''Returns an FTPFile for every file under the directory `root`.
+        Each level of the tree is listed in parallel.
+        '''
+        files = []
+        pending = [(root, None)]
+        pool = ThreadPool(self.pool_size)
+        try:
+            while pending:
+                next_pending = []
+                for path, entries, previous in pool.imap(self._list, pending):
+                    previous = dict((e.name, e) for e in previous)
+                    for entry in entries:
+                        child = '/'.join([path, entry.name])
+                        if entry.is_dir:
+                            next_pending.append((child, entry.mtime))
+                            continue
+                        old = previous.get(entry.name)
+                        changed = old is None or (old.mtime, old.size) != (
+                            entry.mtime, entry.size)
+                        files.append(FTPFile(
+                            '/'.join(['ftp://' + self.host, child]),
+                            child, entry.mtime, entry.size, changed))
+                pending = next_pending
+        finally:
+            pool.terminate()
+        return files
+
+    def read(self, path):
+        '''Fetches the contents of the file at `path`.'''
+        buf = BytesIO()
+        with self.pool.connection() as ftp:
+            ftp.retrbinary('RETR /' + path, buf.write)
+        return buf.getvalue()
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def close(self):
+        self.pool.close()
@@ -1,9 +1,95 @@
 import re
+import datetime
+from collections import namedtuple, defaultdict
 
 
-def parse_ftp_listing(text):
-    lines = text.strip().split('\r\n')
-    return (' '.join(line.split()[3:]) for line in lines if line)
+FTPEntry = namedtuple('FTPEntry', 'mtime is_dir size name')
+
+_ftp_entry_re = re.compile(r'''(?x)
+    ^(\d{2}-\d{2}-\d{2}\s+  # Date in mm-dd-yy
+    \d{2}:\d{2}[AP]M)\s+  # Time in hh:mmAM/PM
+    (<DIR>)?\s+  # Directories will have an indicating flag
+    (\d+)?\s+  # Files will have their size in bytes
+    (.+?)\s*$  # Directory or file name is the remaining text
+    ''')
+
+
+def parse_ftp_listing(text, details=False):
+    '''The names in an MS-DOS style FTP LIST response, given as text or
+    as a list of lines. With `details`, FTPEntry tuples instead, with the
+    modification time as a datetime.
+    '''
+    if isinstance(text, basestring):
+        text = text.strip().split('\r\n')
+    for line in text:
+        if not line.strip():
+            continue
+        if not details:
+            yield ' '.join(line.split()[3:])
+            continue
+        mtime, is_dir, size, name = _ftp_entry_re.search(line).groups()
+        mtime = datetime.datetime.strptime(' '.join(mtime.split()),
+                                           '%m-%d-%y %I:%M%p')
+        yield FTPEntry(mtime, bool(is_dir), int(size or 0), name)
+
+
+_bill_id_re = re.compile(r'([A-Z]{2})R?0+(\d+)')
+
+
+def normalize_bill_id(filename):
+    """Turn a file name like 'HB00012I.htm' or 'HBR0012.xml' into the
+    bill id 'HB 12', or None if it doesn't name a bill.
+    """
+    match = _bill_id_re.search(filename.split('/')[-1].split('.')[0])
+    if match is None:
+        return None
+    return ' '.join(match.groups())
+
+
+class BillDocumentIndex(object):
+    """The documents of a session's bills, keyed by normalized bill id.
+
+    ``kinds`` maps a document kind to the FTP directory holding it; each
+    kind's (bill_id, url) lookups are then a dict access rather than a
+    scan over every document in the session.
+    """
+
+    kinds = {
+        'versions': 'bills/{}/billtext/html',
+        'analyses': 'bills/{}/analysis/html',
+        'fiscal_notes': 'bills/{}/fiscalnotes/html',
+        'witnesses': 'bills/{}/witlistbill/html',
+    }
+
+    def __init__(self):
+        self._docs = defaultdict(lambda: defaultdict(list))
+        # Bills with at least one document that changed since the
+        # crawler's previous run.
+        self.changed = set()
+
+    def add(self, kind, bill_id, url, changed=False):
+        self._docs[bill_id][kind].append(url)
+        if changed:
+            self.changed.add(bill_id)
+
+    def get(self, bill_id, kind):
+        docs = self._docs.get(bill_id)
+        if docs is None:
+            return []
+        return docs.get(kind, [])
+
+    def __len__(self):
+        return len(self._docs)
+
+    @classmethod
+    def build(cls, crawler, session_code):
+        """Crawls every document directory for `session_code`."""
+        index = cls()
+        for kind, dir_ in cls.kinds.items():
+            for item in crawler.walk(dir_.format(session_code)):
+                index.add(kind, normalize_bill_id(item.path), item.url,
+                          item.changed)
+        return index
 
 
 _phone_pattern = r'\(?\d+\)?[- ]?\d{3}[-.]\d{4}'
@@ -1,6 +1,7 @@
 import datetime
 import re
-from billy.utils.fulltext import pdfdata_to_text, text_after_line_numbers
+from billy.utils.fulltext import text_after_line_numbers
+from openstates.utils.pdf import pdfdata_to_text
 from billy.scrape.utils import url_xpath
 from .bills import UTBillScraper
 from .legislators import UTLegislatorScraper
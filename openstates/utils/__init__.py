@@ -1,5 +1,9 @@
 from .lxmlize import LXMLMixin
 from .dir import mkdir_p
+from .env import env_flag
+from .cache import DiskCache, cache_path
+from .actions import CachedCategorizer, action_cache
+from .ratelimit import RateLimiter, RateLimitedSession, rate_limiter
 import re
 
 
@@ -0,0 +1,131 @@
+import sys
+import copy
+import atexit
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+
+from .cache import DiskCache
+from .env import env_flag
+
+
+def rules_hash(categorizer):
+    """Returns a digest identifying a categorizer's behavior.
+
+    Covers the categorizer's class name, the source of the modules its
+    class and base classes are defined in (so overridden categorize/hook
+    methods, BaseCategorizer and any module-level functions they call
+    count) and a canonical form of its rules, so editing any of them
+    invalidates results cached under the old one. Code imported from
+    elsewhere isn't covered: after changing it, delete actions.pickle
+    from the cache directory if the cache is persisted.
+    """
+    cls = type(categorizer)
+    parts = ['%s.%s' % (cls.__module__, cls.__name__)]
+    modules = []
+    for klass in inspect.getmro(cls):
+        module = sys.modules.get(klass.__module__)
+        if module is not None and module not in modules:
+            modules.append(module)
+    for module in modules:
+        try:
+            parts.append(inspect.getsource(module))
+        except (IOError, TypeError):
+            pass
+    for rule in cls.rules:
+        parts.append(repr((sorted(rule.regexes), sorted(rule.types),
+                           rule.stop, sorted(rule.attrs.items()))))
+    return hashlib.sha1('\n'.join(parts)).hexdigest()
+
+
+class ActionCache(object):
+    """A bounded LRU cache of categorization results.
+
+    Keys are (categorizer hash, action text) pairs, so one cache can be
+    shared by every state's categorizer. If ``name`` is given the cache
+    is loaded from and saved to the persistent cache directory, so
+    repeated runs start warm.
+    """
+
+    def __init__(self, maxsize=100000, name=None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._store = DiskCache(name) if name else None
+        self._data = OrderedDict()
+        if self._store is not None:
+            self._data.update(self._store.get('entries', ()))
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return dict(hits=self.hits, misses=self.misses, size=len(self._data),
+                    hit_rate=float(self.hits) / lookups if lookups else 0.0)
+
+    def save(self):
+        if self._store is None:
+            return
+        with self._lock:
+            self._store.set('entries', list(self._data.items()))
+        self._store.save()
+
+
+# Shared by every CachedCategorizer unless one is given its own. Setting
+# OPENSTATES_PERSIST_ACTION_CACHE=1 keeps it on disk between runs.
+if env_flag('OPENSTATES_PERSIST_ACTION_CACHE'):
+    action_cache = ActionCache(name='actions')
+    atexit.register(action_cache.save)
+else:
+    action_cache = ActionCache()
+
+
+class CachedCategorizer(object):
+    """Wraps a categorizer so repeated action strings are only
+    categorized once::
+
+        categorizer = CachedCategorizer(Categorizer())
+
+    Results are deep-copied on the way in and out because scrapers
+    routinely mutate the attrs they get back.
+    """
+
+    def __init__(self, categorizer, cache=None):
+        self.categorizer = categorizer
+        self.cache = action_cache if cache is None else cache
+        self.rules_hash = rules_hash(categorizer)
+
+    def __getattr__(self, name):
+        return getattr(self.categorizer, name)
+
+    def categorize(self, text):
+        key = (self.rules_hash, text)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.categorizer.categorize(text)
+            self.cache.set(key, copy.deepcopy(result))
+            return result
+        return copy.deepcopy(result)
@@ -0,0 +1,86 @@
+import os
+import time
+import errno
+import cPickle as pickle
+import threading
+
+from .dir import mkdir_p
+
+
+def cache_path(*parts):
+    """Returns a path under the Open States persistent cache directory.
+
+    The directory is taken from the OPENSTATES_CACHE_DIR environment
+    variable, falling back to a ``cache`` directory inside billy's
+    data directory. Intermediate directories are created as needed.
+    """
+    root = os.environ.get('OPENSTATES_CACHE_DIR')
+    if root is None:
+        from billy.core import settings
+        root = os.path.join(settings.BILLY_DATA_DIR, 'cache')
+    path = os.path.join(root, *parts)
+    mkdir_p(os.path.dirname(path))
+    return path
+
+
+class DiskCache(object):
+    """A small pickle-backed key/value store that survives across runs.
+
+    Entries are stored with the time they were written; if ``expires`` is
+    given (in seconds), older entries are treated as missing. Nothing is
+    written to disk until ``save()`` is called. Safe to share between
+    threads.
+    """
+
+    def __init__(self, name, expires=None):
+        self.path = cache_path(name + '.pickle')
+        self.expires = expires
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return pickle.load(f)
+        except IOError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+        except (EOFError, pickle.UnpicklingError):
+            # A truncated or corrupt cache is just a cold cache.
+            pass
+        return {}
+
+    def _fresh(self, stored_at):
+        return self.expires is None or time.time() - stored_at < self.expires
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                stored_at, value = self._data[key]
+            except KeyError:
+                return default
+        if not self._fresh(stored_at):
+            return default
+        return value
+
+    def __contains__(self, key):
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def save(self):
+        """Atomically writes the unexpired entries back to disk."""
+        with self._lock:
+            data = dict((k, v) for k, v in self._data.items()
+                        if self._fresh(v[0]))
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, self.path)
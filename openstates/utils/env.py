@@ -0,0 +1,13 @@
+import os
+
+
+def env_flag(name, default=False):
+    """
+    A yes/no setting from the environment variable `name`, e.g.
+    NJ_INCREMENTAL=1; 1/true/yes/on (any case) are true, anything else is
+    false. Returns bool(default) if the variable isn't set.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return bool(default)
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,166 @@
+'''
+Batch full-text extraction over the per-state ``extract_text(doc, data)``
+hooks.
+
+Documents are run through their state's hook on a process pool, and the
+results are stored on disk under a hash of the document's bytes and of
+the hook itself, so a document that hasn't changed is only ever
+extracted once per version of the extractor.
+
+    python -m openstates.utils.fulltext ak path/to/documents/*
+'''
+import os
+import sys
+import time
+import hashlib
+import inspect
+import logging
+import importlib
+import mimetypes
+import cPickle as pickle
+from multiprocessing import Pool, cpu_count
+
+from .cache import cache_path
+
+
+logger = logging.getLogger('openstates.fulltext')
+
+_extractors = {}
+
+
+def get_extractor(abbr):
+    '''Returns a state's extract_text hook.'''
+    if abbr not in _extractors:
+        module = importlib.import_module('openstates.' + abbr)
+        _extractors[abbr] = module.extract_text
+    return _extractors[abbr]
+
+
+def extractor_version(abbr):
+    '''Identifies the current version of a state's extract_text hook: its
+    source, plus an optional module-level ``extract_text_version`` that a
+    state can bump when a helper the hook calls changes.
+    '''
+    extract_text = get_extractor(abbr)
+    module = sys.modules[extract_text.__module__]
+    version = str(getattr(module, 'extract_text_version', ''))
+    return hashlib.sha1(version + inspect.getsource(extract_text)).hexdigest()
+
+
+def _extract(args):
+    '''Runs in a worker process.'''
+    abbr, key, doc, data = args
+    try:
+        return key, get_extractor(abbr)(doc, data), None
+    except Exception as exc:
+        return key, None, '%s: %s' % (type(exc).__name__, exc)
+
+
+class TextExtractor(object):
+    '''Extracts text from a state's documents in parallel.
+
+    extract(docs) takes an iterable of (doc, data) pairs, where doc is
+    the document dict (at least its mimetype) and data its raw bytes, and
+    yields (doc, text) pairs as they're ready; cached results come out
+    first in each batch, so output order isn't input order. Documents
+    whose hook raised are logged and skipped.
+    '''
+
+    def __init__(self, abbr, processes=None, batch_size=100):
+        self.abbr = abbr
+        self.version = extractor_version(abbr)
+        self.processes = processes or cpu_count()
+        self.batch_size = batch_size
+        self.docs = self.hits = self.errors = 0
+        self.seconds = 0.0
+
+    def _path(self, key):
+        return cache_path('fulltext', self.abbr, key[:2], key + '.pickle')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return True, pickle.load(f)
+        except (IOError, EOFError, pickle.UnpicklingError):
+            return False, None
+
+    def _store(self, key, text):
+        path = self._path(key)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            pickle.dump(text, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, path)
+
+    def key(self, data):
+        return hashlib.sha1(self.version + data).hexdigest()
+
+    def extract(self, docs):
+        pool = Pool(self.processes)
+        try:
+            batch = []
+            for doc, data in docs:
+                batch.append((doc, data))
+                if len(batch) >= self.batch_size:
+                    for result in self._extract_batch(pool, batch):
+                        yield result
+                    batch = []
+            for result in self._extract_batch(pool, batch):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _extract_batch(self, pool, batch):
+        started = time.time()
+        pending = {}
+        misses = []
+        for doc, data in batch:
+            self.docs += 1
+            key = self.key(data)
+            found, text = self._load(key)
+            if found:
+                self.hits += 1
+                yield doc, text
+            elif key in pending:
+                # The same document twice in one batch.
+                pending[key].append(doc)
+            else:
+                pending[key] = [doc]
+                misses.append((self.abbr, key, doc, data))
+
+        for key, text, error in pool.imap_unordered(_extract, misses):
+            if error is not None:
+                self.errors += 1
+                logger.warning('%s: extract_text failed on %s (%s)' % (
+                    self.abbr, pending[key][0].get('url'), error))
+                continue
+            self._store(key, text)
+            for doc in pending[key]:
+                yield doc, text
+        self.seconds += time.time() - started
+
+    def stats(self):
+        return dict(
+            docs=self.docs, hits=self.hits, errors=self.errors,
+            hit_rate=float(self.hits) / self.docs if self.docs else 0.0,
+            docs_per_second=self.docs / self.seconds if self.seconds else 0.0)
+
+
+def main(abbr, *paths):
+    extractor = TextExtractor(abbr)
+    docs = []
+    for path in paths:
+        mimetype = mimetypes.guess_type(path)[0]
+        with open(path, 'rb') as f:
+            docs.append(({'url': path, 'mimetype': mimetype}, f.read()))
+    for doc, text in extractor.extract(docs):
+        logger.info('%s: %d characters' % (doc['url'], len(text or '')))
+    stats = extractor.stats()
+    print '%d docs, %d cached (%.0f%%), %d errors, %.1f docs/sec' % (
+        stats['docs'], stats['hits'], 100 * stats['hit_rate'],
+        stats['errors'], stats['docs_per_second'])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(*sys.argv[1:])
@@ -0,0 +1,210 @@
+'''
+Indexed SQLite mirrors of Microsoft Access databases.
+
+NJ and NM publish their bill data as zipped Access databases, which
+mdbtools can only read by exporting one table at a time as CSV. A
+mirror exports every table once into a SQLite file next to the other
+cached data, with whatever indexes the scraper asks for, and is reused
+(across chambers and runs) until the zipped database changes. When the
+FTP listing shows a zip hasn't changed, it isn't even downloaded.
+
+Values are kept exactly as mdb-export prints them, so rows read from a
+mirror look the same as rows read from mdb-export's CSV.
+'''
+import os
+import re
+import csv
+import shutil
+import sqlite3
+import zipfile
+import tempfile
+import subprocess
+
+from .cache import cache_path
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def mdb_tables(mdbfile):
+    output = subprocess.check_output(['mdb-tables', '-1', mdbfile],
+                                     close_fds=True)
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+def export_table(mdbfile, table):
+    '''Yields a table's header row, then its rows, from mdb-export.'''
+    proc = subprocess.Popen(['mdb-export', mdbfile, table],
+                            stdout=subprocess.PIPE, close_fds=True)
+    for row in csv.reader(proc.stdout):
+        yield row
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, 'mdb-export')
+
+
+class MDBMirror(object):
+    '''
+    A SQLite copy of an Access database.
+
+    `indexes` maps table names to lists of what to index: column tuples,
+    or SQL expressions that queries filter on, e.g.
+    {'BillSpon': [('BillType', 'BillNumber')]}. A mirror built with other
+    indexes doesn't match any signature, so it's rebuilt.
+    '''
+
+    def __init__(self, path, indexes=None):
+        self.path = path
+        self.indexes = indexes or {}
+        self.index_key = repr(sorted(self.indexes.items()))
+        self.db = None
+        if os.path.exists(path):
+            self._connect()
+
+    def _connect(self):
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        # keep values as the byte strings mdb-export gave us
+        self.db.text_factory = str
+        self.db.row_factory = sqlite3.Row
+
+    @property
+    def signature(self):
+        '''What the mirror was built from, or None.'''
+        if self.db is None:
+            return None
+        try:
+            row = self.db.execute(
+                'SELECT signature, indexes FROM _mirror').fetchone()
+        except sqlite3.DatabaseError:
+            return None
+        if row is None or row[1] != self.index_key:
+            return None
+        return row[0]
+
+    def build(self, mdbfile, signature):
+        '''(Re)builds the mirror from `mdbfile`.'''
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        db = sqlite3.connect(tmp)
+        db.text_factory = str
+        built = False
+        try:
+            for table in mdb_tables(mdbfile):
+                rows = export_table(mdbfile, table)
+                header = next(rows, None)
+                if not header:
+                    continue
+                db.execute('CREATE TABLE %s (%s)' % (
+                    _quote(table), ', '.join(_quote(c) + ' TEXT'
+                                             for c in header)))
+                db.executemany('INSERT INTO %s VALUES (%s)' % (
+                    _quote(table), ', '.join('?' * len(header))), rows)
+                for i, columns in enumerate(self.indexes.get(table, ())):
+                    if not isinstance(columns, basestring):
+                        columns = ', '.join(map(_quote, columns))
+                    db.execute('CREATE INDEX %s ON %s (%s)' % (
+                        _quote('ix_%s_%d' % (table, i)), _quote(table),
+                        columns))
+            db.execute('CREATE TABLE _mirror (signature TEXT, indexes TEXT)')
+            db.execute('INSERT INTO _mirror VALUES (?, ?)',
+                       (signature, self.index_key))
+            db.commit()
+            built = True
+        finally:
+            db.close()
+            if not built:
+                # don't leave a half-built copy behind
+                for path in (tmp, tmp + '-journal'):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        if self.db is not None:
+            self.db.close()
+        os.rename(tmp, self.path)
+        self._connect()
+
+    def query(self, sql, *params):
+        '''Runs `sql`, returning rows as dicts.'''
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def table(self, table):
+        '''Every row of a table as a dict, like csv.DictReader over
+        mdb-export's output.
+        '''
+        return self.query('SELECT * FROM %s' % _quote(table))
+
+
+def zip_signature(zip_path, member):
+    '''Identifies a database inside a zip without extracting it.'''
+    with zipfile.ZipFile(zip_path) as zf:
+        info = zf.getinfo(member)
+    return '%s:%s:%s:%s' % (member, info.CRC, info.file_size,
+                            '-'.join(map(str, info.date_time)))
+
+
+def mirror_path(name):
+    return cache_path('mdb', name + '.sqlite')
+
+
+def mirror_zip(zip_path, member, name, indexes=None, log=None,
+               signature=None):
+    '''
+    Returns the mirror of the database `member` inside the zip at
+    `zip_path`, cached as `name`. The database is only extracted and
+    exported if it differs from the one the mirror was built from, as
+    identified by `signature` (by default, the zip's record of it).
+    '''
+    mirror = MDBMirror(mirror_path(name), indexes)
+    if signature is None:
+        signature = zip_signature(zip_path, member)
+    if mirror.signature == signature:
+        return mirror
+
+    if log:
+        log('building SQLite mirror of %s' % member)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            mdbfile = zf.extract(member, tmpdir)
+        mirror.build(mdbfile, signature)
+    finally:
+        shutil.rmtree(tmpdir)
+    return mirror
+
+
+# e.g. '01-18-17  10:27AM             52469760 DB2016.zip'
+_dos_listing_re = re.compile(
+    r'^(\d{2}-\d{2}-\d{2})\s+(\d{2}:\d{2}[AP]M)\s+(\d+)\s+(.+?)\s*$')
+
+
+def listing_stamps(text):
+    '''Maps the files in a (DOS-style) FTP listing to a string of their
+    modification time and size, which changes whenever a file does.
+    '''
+    stamps = {}
+    for line in text.splitlines():
+        match = _dos_listing_re.match(line)
+        if match:
+            date, time, size, name = match.groups()
+            stamps[name] = '%s %s %s' % (date, time, size)
+    return stamps
+
+
+def mirror_remote(scraper, url, stamp, member, name, indexes=None):
+    '''
+    Returns the mirror of the database `member` in the zip at `url`,
+    whose listing `stamp` came from listing_stamps. If the mirror was
+    built from a zip with the same url and stamp, nothing is downloaded.
+    '''
+    signature = '%s %s' % (url, stamp)
+    mirror = MDBMirror(mirror_path(name), indexes)
+    if stamp is not None and mirror.signature == signature:
+        scraper.info('%s unchanged (%s), using existing mirror' % (url, stamp))
+        return mirror
+
+    fname, resp = scraper.urlretrieve(url)
+    try:
+        mirror = mirror_zip(fname, member, name, indexes, log=scraper.info,
+                            signature=signature if stamp else None)
+    finally:
+        os.remove(fname)
+    return mirror
@@ -0,0 +1,134 @@
+'''
+A shared pool of PDF converter workers.
+
+billy's convert_pdf and pdfdata_to_text fork pdftotext from the scraper
+process for every document, and pdfdata_to_text round-trips the data
+through a temp file. Forking a scraper that has grown large costs more
+than converting most PDFs. So a few converter processes are forked when
+this module is imported, while the scraper is still small, and live for
+the whole scrape; pdftotext is forked from them instead. PDF bytes reach
+pdftotext over pipes, with no temp files, and every conversion has a
+timeout.
+
+convert_pdf and pdfdata_to_text are drop-in replacements for billy's.
+'''
+import os
+import threading
+import subprocess
+import multiprocessing
+
+from billy.core import settings
+
+
+# Converter processes shared by every conversion in the scrape; 0 runs
+# pdftotext straight from the scraper.
+PDF_WORKERS = getattr(settings, 'PDF_WORKERS', 2)
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', PDF_WORKERS))
+
+# Seconds a single conversion may take before it's killed.
+PDF_TIMEOUT = getattr(settings, 'PDF_TIMEOUT', 120)
+PDF_TIMEOUT = int(os.environ.get('PDF_TIMEOUT', PDF_TIMEOUT))
+
+# Same commands as billy.scrape.utils.convert_pdf; '-' reads stdin.
+COMMANDS = {
+    'text': ['pdftotext', '-layout', '{0}', '-'],
+    'text-nolayout': ['pdftotext', '{0}', '-'],
+    'xml': ['pdftohtml', '-xml', '-stdout', '{0}'],
+    'html': ['pdftohtml', '-stdout', '{0}'],
+}
+
+# These can't read from a pipe, so they're only given file names.
+NEEDS_FILE = ('xml', 'html')
+
+
+class PDFConversionError(Exception):
+    pass
+
+
+def _run(type, filename=None, data=None, timeout=PDF_TIMEOUT):
+    '''Runs one conversion, feeding `data` over stdin if given.'''
+    args = [arg.format(filename or '-') for arg in COMMANDS[type]]
+    proc = subprocess.Popen(args, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            close_fds=True)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        try:
+            proc.kill()
+        except OSError:
+            # It finished just in time.
+            pass
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    try:
+        stdout, stderr = proc.communicate(data)
+    finally:
+        timer.cancel()
+    if timed_out.is_set():
+        raise PDFConversionError('%s timed out after %ds on %s' % (
+            args[0], timeout, filename or 'piped data'))
+    return stdout
+
+
+class PDFConverterPool(object):
+    '''`processes` long-lived workers that run pdftotext/pdftohtml.'''
+
+    def __init__(self, processes=PDF_WORKERS, timeout=PDF_TIMEOUT):
+        self.timeout = timeout
+        self.pool = multiprocessing.Pool(processes)
+
+    def convert(self, type='text', filename=None, data=None):
+        if filename is not None:
+            # The workers keep the directory they were started in.
+            filename = os.path.abspath(filename)
+        result = self.pool.apply_async(
+            _run, (type, filename, data, self.timeout))
+        # The worker enforces the timeout; this only guards against a
+        # worker that died.
+        try:
+            return result.get(self.timeout * 2)
+        except multiprocessing.TimeoutError:
+            raise PDFConversionError('no converter answered within %ds' %
+                                     (self.timeout * 2))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+def start_pool(processes=PDF_WORKERS):
+    '''Starts the process-wide converter pool, unless it's disabled or
+    this is a daemonic process (e.g. another pool's worker), which can't
+    have children; conversions then run pdftotext directly.
+    '''
+    if processes < 1 or multiprocessing.current_process().daemon:
+        return None
+    return PDFConverterPool(processes)
+
+
+def _convert(type, filename=None, data=None):
+    if data is not None and type in NEEDS_FILE:
+        raise ValueError('%s conversion needs a file name' % type)
+    if _pool is None:
+        return _run(type, filename, data)
+    return _pool.convert(type, filename, data)
+
+
+def convert_pdf(filename, type='xml'):
+    return _convert(type, filename=filename)
+
+
+def convert_pdf_data(data, type='text'):
+    return _convert(type, data=data)
+
+
+def pdfdata_to_text(data):
+    return convert_pdf_data(data, 'text')
+
+
+# Started on import: billy imports each state's module, and with it this
+# one, before any scraping, so the workers are forked from a small process.
+_pool = start_pool()
@@ -0,0 +1,150 @@
+import time
+import random
+import threading
+import urlparse
+from email.utils import parsedate_tz, mktime_tz
+
+import requests
+
+
+class TokenBucket(object):
+    """Allows ``rate`` requests per second on average, with bursts of up
+    to ``burst``. Safe to share between threads.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be made. Returns the seconds waited."""
+        waited = 0
+        while True:
+            with self._lock:
+                now = time.time()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    elapsed = now - self.updated
+                    self.tokens = min(self.burst,
+                                      self.tokens + elapsed * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Holds every caller back for ``seconds``, e.g. after a 429."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+            self.tokens = 0
+
+
+def retry_after(response):
+    """Seconds to wait according to a response's Retry-After header, which
+    may be either a number of seconds or an HTTP date; None if absent.
+    """
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0, mktime_tz(parsed) - time.time())
+
+
+class RateLimiter(object):
+    """Per-host request budgets and retry policy for API clients.
+
+    Every request to a host first takes a token from that host's bucket.
+    Responses with a status in ``retry_statuses`` are retried up to
+    ``max_retries`` times; the wait is the Retry-After header when the
+    server sends one, and exponential backoff with full jitter otherwise.
+    The wait pauses the whole host bucket, so concurrent workers back
+    off together instead of piling on.
+    """
+
+    def __init__(self, rate=1, burst=1, max_retries=5, backoff=1,
+                 max_backoff=120, retry_statuses=(429, 503)):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+
+    def set_budget(self, host, rate, burst=1):
+        with self._lock:
+            self._buckets[host] = TokenBucket(rate, burst)
+
+    def bucket(self, url):
+        host = urlparse.urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def _record(self, waited=0, retried=False):
+        with self._lock:
+            self.wait_seconds += waited
+            if retried:
+                self.retries += 1
+            else:
+                self.requests += 1
+
+    def call(self, url, send):
+        """Calls ``send()`` to make a request to ``url`` within the host's
+        budget, retrying throttled responses. Returns the final response.
+        """
+        bucket = self.bucket(url)
+        attempt = 0
+        while True:
+            self._record(waited=bucket.acquire(), retried=attempt > 0)
+            response = send()
+            if response.status_code not in self.retry_statuses or \
+                    attempt >= self.max_retries:
+                return response
+
+            delay = retry_after(response)
+            if delay is None:
+                delay = random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            bucket.pause(delay)
+            attempt += 1
+
+    def stats(self):
+        return dict(requests=self.requests, retries=self.retries,
+                    wait_seconds=self.wait_seconds)
+
+
+# Shared by API clients in the same process, so every worker draws on
+# the same per-host budget.
+rate_limiter = RateLimiter()
+
+
+class RateLimitedSession(requests.Session):
+    """A requests session whose requests all go through a RateLimiter."""
+
+    def __init__(self, limiter=None):
+        super(RateLimitedSession, self).__init__()
+        self.limiter = rate_limiter if limiter is None else limiter
+
+    def request(self, method, url, *args, **kwargs):
+        send = lambda: super(RateLimitedSession, self).request(
+            method, url, *args, **kwargs)
+        return self.limiter.call(url, send)
@@ -0,0 +1,176 @@
+import re
+import collections
+
+
+class PseudoMatch(object):
+    '''A fake match object that provides the same basic interface
+    as _sre.SRE_Match.'''
+
+    def __init__(self, group, start, end):
+        self._group = group
+        self._start = start
+        self._end = end
+
+    def group(self):
+        return self._group
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+    def _tuple(self):
+        return (self._group, self._start, self._end)
+
+    def __repr__(self):
+        return 'PseudoMatch(group=%r, start=%r, end=%r)' % self._tuple()
+
+
+# Characters that are ignored when matching, so that "A.B. 123" matches
+# the term "AB123".
+IGNORED = frozenset(",. '&[]")
+
+
+class Trie(object):
+    '''An Aho-Corasick automaton over match terms.
+
+    Terms are added with trie_add; the automaton is compiled (failure
+    links and all) the first time it's scanned, and again only if more
+    terms are added. Scanning is a single pass over the text.
+    '''
+
+    def __init__(self):
+        # State 0 is the root. For each state: its transitions, its
+        # failure link, the value of the term ending there (if any), the
+        # nearest state along the failure links that ends a term, and
+        # its depth (the length of the term it spells).
+        self.goto = [{}]
+        self.values = [None]
+        self.depth = [0]
+        self.fail = None
+        self.output = None
+
+    def add(self, seq, value):
+        state = 0
+        for c in seq:
+            if c in IGNORED:
+                continue
+            try:
+                state = self.goto[state][c]
+            except KeyError:
+                self.goto.append({})
+                self.values.append(None)
+                self.depth.append(self.depth[state] + 1)
+                self.goto[state][c] = len(self.goto) - 1
+                state = len(self.goto) - 1
+        if state:
+            self.values[state] = value
+        self.fail = self.output = None
+
+    def __len__(self):
+        return sum(1 for value in self.values if value is not None)
+
+    def compile(self):
+        goto, values = self.goto, self.values
+        fail = [0] * len(goto)
+        output = [0] * len(goto)
+
+        queue = collections.deque(goto[0].itervalues())
+        while queue:
+            state = queue.popleft()
+            for c, child in goto[state].iteritems():
+                queue.append(child)
+                f = fail[state]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(c, 0)
+                fail[child] = f
+                output[child] = f if values[f] is not None else output[f]
+
+        self.fail, self.output = fail, output
+        # The first term ending at each state, if any.
+        self.emit = [node if value is not None else output[node]
+                     for node, value in enumerate(values)]
+        self.emit[0] = 0
+        self.starts = re.compile(u'[%s]' % u''.join(
+            re.escape(c) for c in goto[0]) if goto[0] else u'(?!)', re.U)
+
+    def scan(self, s, _match=PseudoMatch):
+        '''Returns the leftmost-longest matches in s, without overlaps,
+        as [match, value...] lists.
+        '''
+        if self.fail is None:
+            self.compile()
+        goto, fail, output = self.goto, self.fail, self.output
+        values, depth, emit = self.values, self.depth, self.emit
+        next_start = self.starts.search
+        ignored = IGNORED
+
+        # The longest term found starting at each position in s, and
+        # where it ends.
+        longest = {}
+        state = 0
+        i = -1
+        while True:
+            i += 1
+            if not state:
+                # Jump straight to the next character that can start a
+                # term; most text can't.
+                m = next_start(s, i)
+                if m is None:
+                    break
+                i = m.start()
+            elif i == len(s):
+                break
+            c = s[i]
+            if c in ignored:
+                continue
+
+            nxt = goto[state].get(c)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(c)
+            state = nxt or 0
+
+            found = emit[state]
+            while found:
+                # Walk back over the term, skipping ignored characters,
+                # to find where it starts.
+                start = i
+                remaining = depth[found] - 1
+                while remaining:
+                    start -= 1
+                    if s[start] not in ignored:
+                        remaining -= 1
+                best = longest.get(start)
+                if best is None or depth[found] > depth[best[0]]:
+                    longest[start] = (found, i)
+                found = output[found]
+
+        res = []
+        k = 0
+        for start in sorted(longest):
+            if start < k:
+                # overlaps the previous match
+                continue
+            found, end = longest[start]
+            k = end + 1
+            res.append([_match(group=s[start:k], start=start, end=end)] +
+                       values[found])
+        return res
+
+
+def trie_add(trie, seq_value_2tuples):
+    '''Given a trie, add the match terms into the trie.
+    '''
+    for seq, value in seq_value_2tuples:
+        trie.add(seq, value)
+    return trie
+
+
+def trie_scan(trie, s):
+    '''
+    Finds all matches for `s` in `trie`.
+    '''
+    return trie.scan(s)
@@ -7,7 +7,7 @@ from .actions import Categorizer, committees_abbrs
 from .utils import xpath
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
-from openstates.utils import LXMLMixin
+from openstates.utils import LXMLMixin, CachedCategorizer
 
 import lxml.etree
 import lxml.html
@@ -17,7 +17,7 @@ import feedparser
 class WABillScraper(BillScraper, LXMLMixin):
     jurisdiction = 'wa'
     _base_url = 'http://wslwebservices.leg.wa.gov/legislationservice.asmx'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
     _subjects = defaultdict(list)
 
     ORDINALS = {
@@ -6,7 +6,7 @@ from collections import defaultdict
 
 import scrapelib
 
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 
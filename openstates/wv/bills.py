@@ -8,12 +8,13 @@ from urllib import quote, unquote_plus
 
 import lxml.html
 
-from billy.scrape.utils import convert_pdf
+from openstates.utils.pdf import convert_pdf
 from billy.scrape.bills import BillScraper, Bill
 from billy.scrape.votes import Vote
 import scrapelib
 
 from .actions import Categorizer
+from openstates.utils import CachedCategorizer
 
 
 class _Url(object):
@@ -37,7 +38,7 @@ class _Url(object):
 
 class WVBillScraper(BillScraper):
     jurisdiction = 'wv'
-    categorizer = Categorizer()
+    categorizer = CachedCategorizer(Categorizer())
 
     bill_types = {'B': 'bill',
                   'R': 'resolution',
@@ -1,7 +1,7 @@
 import re
 import datetime
 from billy.scrape.utils import url_xpath
-from billy.utils.fulltext import pdfdata_to_text
+from openstates.utils.pdf import pdfdata_to_text
 from .bills import WYBillScraper
 from .legislators import WYLegislatorScraper
 from .committees import WYCommitteeScraper
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+'''
+Counts the SQL queries CABillScraper issues per bill, comparing plain
+lazy loading with the chunked, eager-loading strategy in
+openstates.ca.bills. Needs a loaded capublic database.
+
+    python scripts/benchmarks/ca_queries.py 20152016 [limit]
+'''
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from openstates.ca.bills import CABillScraper, BILL_CHUNK_SIZE
+from openstates.ca.models import CABill
+
+
+def touch(bill):
+    '''Walk the same relations scrape_bill_type does.'''
+    for version in bill.versions:
+        version.bill_xml
+        list(version.authors)
+    list(bill.actions)
+    for vote in bill.votes:
+        vote.motion, vote.location
+        list(vote.votes)
+
+
+def run(label, session, bills):
+    queries = [0]
+
+    def count(*args):
+        queries[0] += 1
+
+    event.listen(session.bind, 'before_cursor_execute', count)
+    started = time.time()
+    n = 0
+    for bill in bills:
+        touch(bill)
+        n += 1
+    elapsed = time.time() - started
+    event.remove(session.bind, 'before_cursor_execute', count)
+
+    print '%-6s %6d bills %8d queries %6.2f queries/bill %7.1fs' % (
+        label, n, queries[0], float(queries[0]) / (n or 1), elapsed)
+
+
+def main(session_year, limit=None):
+    conn_str = 'mysql://%s:%s@localhost/capublic?charset=utf8' % (
+        os.environ.get('MYSQL_USER', 'root'),
+        os.environ.get('MYSQL_PASSWORD', ''))
+    Session = sessionmaker(bind=create_engine(conn_str))
+
+    def query(session):
+        query = session.query(CABill).filter_by(session_year=session_year)
+        if limit:
+            query = query.order_by(CABill.bill_id).limit(limit)
+        return query
+
+    session = Session()
+    run('lazy', session, query(session))
+    session.close()
+
+    # iter_bills only needs the scraper's session.
+    scraper = CABillScraper.__new__(CABillScraper)
+    scraper.session = Session()
+    run('eager', scraper.session,
+        scraper.iter_bills(query(scraper.session), BILL_CHUNK_SIZE))
+    scraper.session.close()
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:3])
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+'''
+Throughput of the DC LIMS search paging and response decoding.
+
+Replays recorded GetPublicAdvancedSearch responses (files holding the
+raw response body, {"d": "..."}), or synthetic ones shaped like them if
+no directory is given, with a simulated round-trip time per request:
+
+  - decoding: the old recursive decode_json against the iterative one
+  - paging: one page at a time, as the scraper used to, against
+    search_pages fetching DC_MAX_IN_FLIGHT pages at a time
+
+    python scripts/benchmarks/dc_lims.py [recorded_dir] [latency]
+'''
+import os
+import sys
+import json
+import time
+
+from openstates.dc.utils import decode_json, search_pages
+
+PER_PAGE = 10
+
+
+def old_decode_json(stringy_json):
+    if type(stringy_json) == dict:
+        for key in stringy_json:
+            stringy_json[key] = old_decode_json(stringy_json[key])
+    elif type(stringy_json) == list:
+        for i in range(len(stringy_json)):
+            stringy_json[i] = old_decode_json(stringy_json[i])
+    elif type(stringy_json) in (str, unicode):
+        if len(stringy_json) > 0 and stringy_json[0] in ["[", "{", u"[", u"{"]:
+            return old_decode_json(json.loads(stringy_json))
+    return stringy_json
+
+
+def synthetic_pages(n_records=2000):
+    '''Response bodies for a search of n_records, double-encoded the way
+    LIMS does it.'''
+    pages = []
+    for start in xrange(0, n_records, PER_PAGE):
+        rows = []
+        for i in xrange(start, min(start + PER_PAGE, n_records)):
+            rows.append(json.dumps({
+                'Title': 'B21-%04d' % i,
+                'ShortTitle': 'Synthetic Amendment Act of 2015 no. %d' % i,
+                'LegislationCategories': json.dumps([
+                    {'Id': 1, 'Name': 'Bill'}, {'Id': 7, 'Name': 'Act'}]),
+                'Modified': '/Date(1420070400000)/',
+            }))
+        inner = json.dumps({'sEcho': 2, 'iTotalRecords': n_records,
+                            'iTotalDisplayRecords': n_records,
+                            'aaData': json.dumps(rows)})
+        pages.append(json.dumps({'d': inner}))
+    pages.append(json.dumps({'d': json.dumps({'aaData': '[]'})}))
+    return pages
+
+
+def recorded_pages(path):
+    pages = []
+    for fn in sorted(os.listdir(path)):
+        with open(os.path.join(path, fn)) as f:
+            pages.append(f.read())
+    return pages
+
+
+def main(recorded=None, latency=0.1):
+    latency = float(latency)
+    bodies = recorded_pages(recorded) if recorded else synthetic_pages()
+    print '%d pages, %.1fMB' % (len(bodies),
+                                sum(map(len, bodies)) / 1024.0 / 1024)
+
+    for name, decode in (('recursive', old_decode_json),
+                         ('iterative', decode_json)):
+        started = time.time()
+        for body in bodies:
+            decode(json.loads(body)['d'])
+        elapsed = time.time() - started
+        print 'decode %-10s %.3fs, %.0f pages/sec' % (
+            name + ':', elapsed, len(bodies) / elapsed)
+
+    def fetch_page(start):
+        time.sleep(latency)
+        index = start // PER_PAGE
+        body = bodies[index] if index < len(bodies) else bodies[-1]
+        return decode_json(json.loads(body)['d'])
+
+    started = time.time()
+    start = pages = 0
+    while True:
+        data = fetch_page(start)['aaData']
+        if not data:
+            break
+        pages += 1
+        start += PER_PAGE
+    elapsed = time.time() - started
+    print 'paging sequential:  %.2fs, %.1f pages/sec' % (elapsed,
+                                                         pages / elapsed)
+
+    for workers in (4, 8):
+        started = time.time()
+        pages = sum(1 for _ in search_pages(fetch_page, PER_PAGE, workers))
+        elapsed = time.time() - started
+        print 'paging %d at a time: %.2fs, %.1f pages/sec' % (
+            workers, elapsed, pages / elapsed)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:3])
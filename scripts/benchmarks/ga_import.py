@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+'''
+Times importing openstates.ga in fresh interpreters, and checks that no
+SOAP client (and so no WSDL fetch) was made along the way.
+
+    python scripts/benchmarks/ga_import.py [runs]
+'''
+import sys
+import time
+import subprocess
+
+CHILD = '''
+import time
+started = time.time()
+import openstates.ga
+from openstates.ga import util
+print time.time() - started, len(util._clients)
+'''
+
+
+def main(runs=5):
+    runs = int(runs)
+    times = []
+    for _ in xrange(runs):
+        started = time.time()
+        out = subprocess.check_output([sys.executable, '-c', CHILD])
+        wall = time.time() - started
+        seconds, clients = out.split()
+        times.append(float(seconds))
+        print 'import: %.3fs (interpreter total %.3fs), clients built: %s' % (
+            float(seconds), wall, clients)
+    times.sort()
+    print 'median import of openstates.ga over %d runs: %.3fs' % (
+        runs, times[len(times) // 2])
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
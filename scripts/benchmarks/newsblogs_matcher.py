@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+'''
+Compares the nested-dict trie the newsblogs/legatron scanners used to
+use against the Aho-Corasick Trie, over a synthetic state: every bill
+id, legislator title variation and committee name variation the
+Extractor would add, scanned against a corpus of feed summaries that
+mention them.
+
+    python scripts/benchmarks/newsblogs_matcher.py [entries]
+'''
+import sys
+import time
+import random
+from operator import itemgetter
+
+from openstates.utils.trie import Trie, PseudoMatch, trie_add, trie_scan
+
+FIRST = ('John Mary Robert Patricia Michael Linda William Barbara David '
+         'Elizabeth Richard Susan Joseph Jessica Thomas Sarah Charles Karen '
+         'Daniel Nancy Matthew Lisa Anthony Betty Mark Helen').split()
+LAST = ('Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez '
+        'Martinez Hernandez Lopez Gonzalez Wilson Anderson Thomas Taylor '
+        'Moore Jackson Martin Lee Perez Thompson White Harris Sanchez Clark '
+        'Ramirez Lewis Robinson Walker Young Allen King Wright Scott Torres '
+        'Nguyen Hill Flores Green Adams Nelson Baker Hall Rivera Campbell '
+        'Mitchell Carter Roberts').split()
+SUBJECTS = ('Agriculture Appropriations Banking Budget Education Energy '
+            'Environment Finance Health Housing Insurance Judiciary Labor '
+            'Rules Transportation Veterans Water Revenue Ethics Commerce '
+            'Elections Natural Resources').split()
+TITLES = {
+    'upper': ['Senator', 'Senate member', 'Sen.', 'Councilman'],
+    'lower': ['Assemblymember', 'Assembly member', 'Assemblyman',
+              'Representative', 'Rep.', 'Council member'],
+}
+FILLER = ('the a bill would said on Tuesday in committee vote passed after '
+          'hearing testimony from residents about budget schools and roads '
+          'lawmakers debated amendment floor session spokesman reported '
+          'opposition supporters governor signed measure').split()
+
+
+def terms(rng):
+    '''(term, value) pairs like Extractor.build_trie makes.'''
+    pairs = []
+    for n in xrange(1, 3001):
+        for prefix in ('AB', 'SB', 'ACR', 'SJR'):
+            pairs.append(('%s%d' % (prefix, n), ['bills', prefix + str(n)]))
+    legislators = []
+    for n in xrange(120):
+        chamber = 'upper' if n < 40 else 'lower'
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        legislators.append((chamber, first, last))
+        for title in TITLES[chamber]:
+            for name in (last, '%s %s' % (first, last)):
+                pairs.append(('%s %s' % (title, name), ['legislators', n]))
+        pairs.append((' %s %s' % (first, last), ['legislators', n]))
+    for n, subject in enumerate(SUBJECTS):
+        for chamber in ('Senate', 'Assembly'):
+            for phrase in ('Standing Committee on %s', 'Committee on %s',
+                           '%s Committee', chamber + ' %s Committee',
+                           chamber + ' Committee on %s'):
+                pairs.append((phrase % subject, ['committees', n]))
+    return pairs, legislators
+
+
+def corpus(rng, legislators, n_entries):
+    entries = []
+    for _ in xrange(n_entries):
+        words = [rng.choice(FILLER) for _ in xrange(rng.randint(40, 120))]
+        for _ in xrange(rng.randint(1, 6)):
+            chamber, first, last = rng.choice(legislators)
+            mention = rng.choice([
+                '%s %s' % (rng.choice(TITLES[chamber]), last),
+                '%s %s %s' % (rng.choice(TITLES[chamber]), first, last),
+                'A.B. %d' % rng.randint(1, 3000),
+                'SB %d' % rng.randint(1, 3000),
+                'the Senate %s Committee' % rng.choice(SUBJECTS),
+            ])
+            words.insert(rng.randint(0, len(words)), mention)
+        entries.append(' '.join(words))
+    return entries
+
+
+# The nested-dict trie, as it was.
+
+def old_trie_add(trie, seq_value_2tuples, terminus=0):
+    for seq, value in seq_value_2tuples:
+        this = trie
+        w_len = len(seq) - 1
+        for i, c in enumerate(seq):
+            if c in ",. '&[]":
+                continue
+            try:
+                this = this[c]
+            except KeyError:
+                this[c] = {}
+                this = this[c]
+            if i == w_len:
+                this[terminus] = value
+    return trie
+
+
+def old_trie_scan(trie, s, _match=PseudoMatch, second=itemgetter(1)):
+    res = []
+    match = []
+    this = trie
+    in_match = False
+    for i, c in enumerate(s):
+        if c in ",. '&[]":
+            if in_match:
+                match.append((i, c))
+            continue
+        if c in this:
+            this = this[c]
+            match.append((i, c))
+            in_match = True
+            if 0 in this:
+                _matchobj = _match(group=''.join(map(second, match)),
+                                   start=match[0][0], end=match[-1][0])
+                res.append([_matchobj] + this[0])
+        else:
+            in_match = False
+            if match:
+                match = []
+            this = trie
+            if c in this:
+                this = this[c]
+                match.append((i, c))
+                in_match = True
+    prev = None
+    for tpl in reversed(res):
+        match, _, _ = tpl
+        if prev:
+            a = prev._start <= match._start
+            b = match._end <= prev._end
+            c = match._group in prev._group
+            if a and b and c:
+                res.remove(tpl)
+        prev = match
+    return res
+
+
+def run(name, build, scan, pairs, entries):
+    started = time.time()
+    trie = build(pairs)
+    built = time.time() - started
+    started = time.time()
+    found = sum(len(scan(trie, entry)) for entry in entries)
+    scanned = time.time() - started
+    print '%-14s built in %.2fs, scanned in %.2fs, %d matches' % (
+        name + ':', built, scanned, found)
+
+
+def main(n_entries=2000):
+    rng = random.Random(0)
+    pairs, legislators = terms(rng)
+    entries = corpus(rng, legislators, int(n_entries))
+    print '%d terms, %d entries, %d characters' % (
+        len(pairs), len(entries), sum(map(len, entries)))
+
+    run('nested dicts', lambda p: old_trie_add({}, p), old_trie_scan,
+        pairs, entries)
+
+    def build(p):
+        trie = trie_add(Trie(), p)
+        trie.compile()
+        return trie
+    run('aho-corasick', build, trie_scan, pairs, entries)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])
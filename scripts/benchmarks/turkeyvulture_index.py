@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+'''
+Builds turkeyvulture's search index for a whole state with the old
+IndexBuilder (every substring of every word stored in a set) and the
+current one (integer posting lists plus a gram table), the same way
+build_index.py does, and compares build time, memory, query time and
+the answers to every query the old index could answer. Then, in separate
+processes so each has its own peak memory, builds and dump()s each as
+build_index.py does, and checks that what the new JSON answers for every
+key matches what the old JSON spelled out.
+
+With a state abbreviation, the state's legislators, committees and bills
+come from billy's database; otherwise a synthetic state of about the
+same size is used.
+
+    python scripts/benchmarks/turkeyvulture_index.py [abbr [session]]
+'''
+import os
+import re
+import sys
+import json
+import time
+import bisect
+import pickle
+import random
+import shutil
+import resource
+import tempfile
+import collections
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'experimental', 'turkeyvulture'))
+import jsindex
+from jsindex import substrings
+
+
+class OldIndexBuilder(jsindex.IndexBuilder):
+    '''IndexBuilder as it was.'''
+
+    def __init__(self):
+        jsindex.IndexBuilder.__init__(self)
+        self.stem2id_ = {}
+        self.index = collections.defaultdict(lambda: set())
+        self.tails = collections.defaultdict(lambda: set())
+        self.new_id = iter(xrange(sys.maxint))
+
+    def get_stem_id(self, stem):
+        try:
+            stem_id = self.stem2id_[stem]
+        except KeyError:
+            stem_id = self.stem2id_[stem] = self.new_id.next()
+        return stem_id
+
+    def _add_word(self, word, object_id, do_stem=True):
+        if do_stem:
+            stem = self.stem_word(word)
+            tail = word.replace(stem, '', 1)
+        else:
+            stem = word
+        stem_id = self.get_stem_id(stem)
+        self.index[stem_id].add(object_id)
+        if do_stem and tail:
+            self.tails[stem_id].add(tail)
+        if stem != word:
+            stem_id = self.get_stem_id(word)
+            self.index[stem_id].add(object_id)
+
+    def add(self, object_type, objects, text_func=None, substrs=False,
+            all_substrs=False, storekeys=None):
+        for obj in objects:
+            id_ = obj['_id']
+            if storekeys:
+                obj_ = dict(zip(storekeys, map(obj.get, storekeys)))
+            else:
+                obj_ = obj
+            self.objects[id_] = obj_
+            text = text_func(obj)
+            words = set(filter(self.f, re.findall(r'\w+', text.lower())))
+            words = words - self.stopwords
+            for w in words:
+                self._add_word(w, id_)
+                if all_substrs:
+                    for substring in substrings(w):
+                        self._add_word(substring, id_, do_stem=False)
+                elif substrs:
+                    for substring in substrings(w, from_beginning_only=True):
+                        self._add_word(substring, id_, do_stem=False)
+
+    def query(self, word):
+        stem = self.stem_word(word)
+        return self.index[self.stem2id_[stem]]
+
+    def jsondata(self):
+        return {
+            'stem2id': self.stem2id_,
+            'id2stem': dict(t[::-1] for t in self.stem2id_.items()),
+            'index': dict((k, list(v)) for (k, v) in self.index.items()),
+            'tails': dict((k, list(v)) for (k, v) in self.tails.items()),
+            'objects': self.objects
+            }
+
+    def dump(self, fp):
+        json.dump(self.jsondata(), fp, cls=jsindex.JSONDateEncoder)
+
+
+def deep_size(obj, seen=None):
+    '''Bytes held by obj and everything it refers to, counting shared
+    objects once.'''
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.iteritems():
+            size += deep_size(k, seen) + deep_size(v, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_size(item, seen)
+    return size
+
+
+def index_size(builder, attrs):
+    seen = set([id(builder.objects)])
+    # The objects and their ids are the same in both; don't count them.
+    for id_ in builder.objects:
+        seen.add(id(id_))
+    return sum(deep_size(getattr(builder, attr), seen) for attr in attrs)
+
+
+WORDS = ('health education budget appropriations transportation water '
+         'energy insurance environmental protection agriculture elections '
+         'taxation revenue veterans housing firearms criminal procedure '
+         'juvenile justice public safety employment unemployment workers '
+         'compensation pensions retirement hospitals pharmaceuticals '
+         'telecommunications broadband municipalities counties property '
+         'vehicles highways licensing professions contractors '
+         'redevelopment infrastructure wildlife fisheries forestry').split()
+NAMES = ('Anderson Baker Castillo Delgado Eggman Fletcher Gatto Hernandez '
+         'Irwin Jackson Kalra Levine Mullin Nazarian Obernolte Patterson '
+         'Quirk Rendon Salas Ting Umberg Voepel Waldron Yamada').split()
+
+
+SYLLABLES = ('al an ar ber ca con de di el en er es fi ge in is la le '
+             'li ma men mo na ne ni or pa per pro re ri sa se ta te ti '
+             'tion to tra un ver').split()
+
+
+def vocabulary(rng, n_words=15000):
+    words = set(WORDS)
+    while len(words) < n_words:
+        words.add(''.join(rng.choice(SYLLABLES)
+                          for _ in xrange(rng.randint(2, 5))))
+    return sorted(words)
+
+
+def synthetic_state(rng, n_bills=4000):
+    # Title words follow a Zipf-like distribution, as they do in bills.
+    words = vocabulary(rng)
+    rng.shuffle(words)
+    weights = [1.0 / (rank + 1) for rank in xrange(len(words))]
+    total = sum(weights)
+    cumulative = []
+    running = 0
+    for weight in weights:
+        running += weight / total
+        cumulative.append(running)
+
+    def word():
+        return words[min(bisect.bisect(cumulative, rng.random()),
+                         len(words) - 1)]
+
+    legislators = []
+    for n in xrange(120):
+        legislators.append({
+            '_id': 'XXL%06d' % n, '_type': 'person',
+            'full_name': '%s %s' % (rng.choice(NAMES), rng.choice(NAMES)),
+            'district': str(n % 80 + 1),
+            'party': rng.choice(['Democratic', 'Republican'])})
+    committees = []
+    for n in xrange(60):
+        committees.append({
+            '_id': 'XXC%06d' % n, '_type': 'committee',
+            'committee': ' '.join(rng.sample(WORDS, 2)).title(),
+            'subcommittee': ''})
+    bills = []
+    for n in xrange(n_bills):
+        title = ' '.join(word() for _ in xrange(rng.randint(5, 25)))
+        bills.append({
+            '_id': 'XXB%08d' % n, '_type': 'bill',
+            'bill_id': '%s %d' % (rng.choice(['AB', 'SB', 'ACR']), n),
+            'title': 'An act relating to ' + title,
+            'subjects': rng.sample(WORDS, rng.randint(0, 3))})
+    return legislators, committees, bills
+
+
+def mongo_state(abbr, session=None):
+    from billy.models import db
+    legislators = list(db.legislators.find({'state': abbr, 'active': True}))
+    committees = list(db.committees.find({'state': abbr}))
+    spec = {'state': abbr}
+    if session:
+        spec['session'] = session
+    bills = list(db.bills.find(spec))
+    return legislators, committees, bills
+
+
+def build(cls, legislators, committees, bills):
+    # Text as build_index.py renders it, without needing jinja.
+    builder = cls()
+    builder.add('l', legislators, lambda o: '%(full_name)s %(district)s '
+                '%(party)s' % o, all_substrs=True)
+    builder.add('c', committees, lambda o: '%s %s' % (
+        o['committee'], o.get('subcommittee') or ''), all_substrs=True)
+    builder.add('b', bills, lambda o: '%s %s %s' % (
+        o['bill_id'], o['title'], ' '.join(o.get('subjects', []))),
+        substrs=True)
+    return builder
+
+
+def peak_rss():
+    # kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def dump_peak(cls, legislators, committees, bills, path):
+    builder = build(cls, legislators, committees, bills)
+    built_rss = peak_rss()
+    started = time.time()
+    with open(path, 'w') as f:
+        builder.dump(f)
+    return built_rss, peak_rss(), time.time() - started
+
+
+def in_child(func, *args):
+    '''Runs func in a forked process, so its peak memory is its own.'''
+    read, write = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(read)
+        with os.fdopen(write, 'w') as f:
+            pickle.dump(func(*args), f)
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as f:
+        result = pickle.load(f)
+    os.waitpid(pid, 0)
+    return result
+
+
+def old_dumped(path):
+    '''The old dump's keys mapped to their objects and tails.'''
+    with open(path) as f:
+        data = json.load(f)
+    id2stem = data['id2stem']
+    assert all(id2stem[str(i)] == k for k, i in data['stem2id'].items())
+    return (dict((id2stem[i], sorted(v)) for i, v in data['index'].items()),
+            dict((id2stem[i], sorted(v)) for i, v in data['tails'].items()),
+            data['objects'])
+
+
+def new_dumped(path, keys):
+    '''The same, for `keys`, looked up in the new dump.'''
+    with open(path) as f:
+        index = jsindex.IndexBuilder.load(f)
+    object_ids = index.object_ids
+    found = dict((key, sorted(object_ids[n] for n in index.lookup(key)))
+                 for key in keys)
+    return (dict((k, v) for (k, v) in found.items() if v),
+            dict((k, sorted(v)) for (k, v) in index.tails.items()),
+            index.objects)
+
+
+def main(abbr=None, session=None):
+    if abbr:
+        legislators, committees, bills = mongo_state(abbr, session)
+    else:
+        legislators, committees, bills = synthetic_state(random.Random(0))
+    print '%d legislators, %d committees, %d bills' % (
+        len(legislators), len(committees), len(bills))
+
+    started = time.time()
+    old = build(OldIndexBuilder, legislators, committees, bills)
+    old_built = time.time() - started
+    started = time.time()
+    new = build(jsindex.IndexBuilder, legislators, committees, bills)
+    new.lookup('')
+    new_built = time.time() - started
+
+    old_size = index_size(old, ['stem2id_', 'index', 'tails'])
+    new_size = index_size(new, ['terms', 'tails', 'substr_words',
+                                'prefix_words', 'word_list', 'grams',
+                                'object_ids', 'object_nums'])
+    print 'old: built in %.2fs, %.1fMB, %d keys' % (
+        old_built, old_size / 1048576.0, len(old.stem2id_))
+    print 'new: built in %.2fs, %.1fMB, %d terms, %d words, %d grams' % (
+        new_built, new_size / 1048576.0, len(new.terms),
+        len(new.word_list) + len(new.prefix_words), len(new.grams))
+
+    keys = sorted(old.stem2id_)
+    rng = random.Random(1)
+    queries = rng.sample(keys, min(20000, len(keys)))
+    queries += ['zz' + key for key in queries[:1000]]
+    for name, builder in (('old', old), ('new', new)):
+        started = time.time()
+        for q in queries:
+            try:
+                builder.query(q)
+            except KeyError:
+                pass
+        print '%s: %d queries in %.2fs' % (name, len(queries),
+                                           time.time() - started)
+
+    mismatches = 0
+    for key in keys:
+        found = set(new.object_ids[n] for n in new.lookup(key))
+        if found != old.index[old.stem2id_[key]]:
+            mismatches += 1
+    print '%d of %d keys answered differently' % (mismatches, len(keys))
+    old = new = None
+
+    # What build_index.py actually runs: build, then dump() the JSON.
+    dumps = []
+    for name, cls in (('old', OldIndexBuilder), ('new', jsindex.IndexBuilder)):
+        path = os.path.join(tempfile.mkdtemp(), 'index.json')
+        built_rss, dump_rss, elapsed = in_child(
+            dump_peak, cls, legislators, committees, bills, path)
+        print '%s: dump() in %.2fs, peak RSS %.1fMB after building, ' \
+            '%.1fMB while dumping, %.1fMB of JSON' % (
+                name, elapsed, built_rss / 1024.0, dump_rss / 1024.0,
+                os.path.getsize(path) / 1048576.0)
+        dumps.append(path)
+    old_dump = old_dumped(dumps[0])
+    same = old_dump == new_dumped(dumps[1], old_dump[0])
+    print 'dumped JSON answers %s' % ('the same' if same else 'DIFFERENTLY')
+    for path in dumps:
+        shutil.rmtree(os.path.dirname(path))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:3])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+'''
+Compares looking up each bill's documents by scanning flat
+(bill_id, url) lists, as the TX bill scraper used to, against the
+BillDocumentIndex, over a synthetic 10,000-bill session.
+
+    python scripts/benchmarks/tx_document_index.py [bills]
+'''
+import sys
+import time
+
+from openstates.tx.utils import BillDocumentIndex, normalize_bill_id
+
+ROOT = 'ftp://ftp.legis.state.tx.us/bills/84R/'
+
+
+def synthetic_session(n_bills):
+    '''Yields (kind, url) pairs: four versions, two analyses, two fiscal
+    notes and a witness list per bill, split between HB and SB.
+    '''
+    for i in xrange(1, n_bills + 1):
+        prefix = 'HB' if i % 2 else 'SB'
+        name = '%s%05d' % (prefix, i)
+        for stage in 'IEHF':
+            yield 'versions', ROOT + 'billtext/html/%s%s.htm' % (name, stage)
+        for stage in 'HS':
+            yield 'analyses', ROOT + 'analysis/html/%s%s.htm' % (name, stage)
+            yield 'fiscal_notes', ROOT + 'fiscalnotes/html/%s%s.htm' % (
+                name, stage)
+        yield 'witnesses', ROOT + 'witlistbill/html/%sH.htm' % name
+
+
+def main(n_bills=10000):
+    n_bills = int(n_bills)
+    docs = list(synthetic_session(n_bills))
+    bill_ids = sorted(set(normalize_bill_id(url) for _, url in docs))
+
+    started = time.time()
+    lists = dict((kind, []) for kind in BillDocumentIndex.kinds)
+    for kind, url in docs:
+        lists[kind].append((normalize_bill_id(url), url))
+    built = time.time() - started
+    # Scanning every list for every bill is quadratic, so time a sample.
+    sample = bill_ids[::max(1, len(bill_ids) // 200)]
+    started = time.time()
+    for bill_id in sample:
+        for kind in lists:
+            [x for x in lists[kind] if x[0] == bill_id]
+    scan = (time.time() - started) * len(bill_ids) / len(sample)
+    print 'list scan: built in %.3fs, lookups ~%.2fs' % (built, scan)
+
+    started = time.time()
+    index = BillDocumentIndex()
+    for kind, url in docs:
+        index.add(kind, normalize_bill_id(url), url)
+    built = time.time() - started
+    started = time.time()
+    for bill_id in bill_ids:
+        for kind in BillDocumentIndex.kinds:
+            index.get(bill_id, kind)
+    lookup = time.time() - started
+    print 'index:     built in %.3fs, lookups %.4fs (%d bills, %d docs)' % (
+        built, lookup, len(index), len(docs))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])
@@ -2,7 +2,6 @@ import re
 import json
 import os
 import operator
-import functools
 import collections
 import htmlentitydefs
 import urlparse
@@ -20,6 +19,8 @@ from billy.core import db
 from billy.utils import metadata
 from billy.core import settings
 
+from openstates.utils.trie import Trie, trie_add, trie_scan
+
 
 host = settings.MONGO_HOST
 port = settings.MONGO_PORT
@@ -69,174 +70,6 @@ def unescape(text):
     return re.sub("&#?\w+;", fixup, text)
 
 
-class Trie(dict):
-
-    @_CachedAttr
-    def finditer(self):
-        return functools.partial(re.finditer, '|'.join(self))
-
-
-class PseudoMatch(object):
-    '''A fake match object that provides the same basic interface
-    as _sre.SRE_Match.'''
-
-    def __init__(self, group, start, end):
-        self._group = group
-        self._start = start
-        self._end = end
-
-    def group(self):
-        return self._group
-
-    def start(self):
-        return self._start
-
-    def end(self):
-        return self._end
-
-    def _tuple(self):
-        return (self._group, self._start, self._end)
-
-    def __repr__(self):
-        return 'PseudoMatch(group=%r, start=%r, end=%r)' % self._tuple()
-
-
-def trie_add(trie, seq_value_2tuples, terminus=0):
-    '''Given a trie (or rather, a dict), add the match terms into the
-    trie.
-    '''
-    for seq, value in seq_value_2tuples:
-
-        this = trie
-        w_len = len(seq) - 1
-        for i, c in enumerate(seq):
-
-            if c in ",. '&[]":
-                continue
-
-            try:
-                this = this[c]
-            except KeyError:
-                this[c] = {}
-                this = this[c]
-
-            if i == w_len:
-                this[terminus] = value
-
-    return trie
-
-
-def trie_scan(trie, s,
-         _match=PseudoMatch,
-         second=itemgetter(1)):
-    '''
-    Finds all matches for `s` in `trie`.
-    '''
-
-    res = []
-    match = []
-
-    this = trie
-    in_match = False
-
-    for i, c in enumerate(s):
-
-        if c in ",. '&[]":
-            if in_match:
-                match.append((i, c))
-            continue
-
-        if c in this:
-            this = this[c]
-            match.append((i, c))
-            in_match = True
-            if 0 in this:
-                _matchobj = _match(group=''.join(map(second, match)),
-                                   start=match[0][0], end=match[-1][0])
-                res.append([_matchobj] + this[0])
-
-        else:
-            in_match = False
-            if match:
-                match = []
-
-            this = trie
-            if c in this:
-                this = this[c]
-                match.append((i, c))
-                in_match = True
-
-    # Remove any matches that are enclosed in bigger matches.
-    prev = None
-    for tpl in reversed(res):
-        match, _, _ = tpl
-        start, end = match.start, match.end
-
-        if prev:
-            a = prev._start <= match._start
-            b = match._end <= prev._end
-            c = match._group in prev._group
-            if a and b and c:
-                res.remove(tpl)
-
-        prev = match
-
-    return res
-
-
-# def trie_scan(trie, string, _match=PseudoMatch,
-#               second=itemgetter(1)):
-
-#     this = trie
-#     match = []
-#     spans = []
-
-#     for matchobj in trie.finditer(string):
-
-#         pos = matchobj.start()
-#         this = trie
-#         match = []
-
-#         while True:
-
-#             try:
-#                 char = string[pos]
-#             except IndexError:
-#                 break
-
-#             if char in ",. '&[]":
-#                 match.append((pos, char))
-#                 pos += 1
-#                 continue
-
-#             try:
-#                 this = this[char]
-#             except KeyError:
-#                 break
-#             else:
-#                 match.append((pos, char))
-#                 if 0 in this:
-#                     start = matchobj.start()
-#                     end = pos
-#                     pseudo_match = _match(group=''.join(map(second, match)),
-#                                           start=start, end=end)
-
-#                     # Don't yeild a match if this match is contained in a
-#                     # larger match.
-#                     _break = False
-#                     for _start, _end in spans:
-#                         if (_start <= start) and (end <= _end):
-#                             _break = True
-#                     if _break:
-#                         break
-
-#                     spans.append((start, end))
-#                     yield [pseudo_match] + this[0]
-#                     break
-#                 else:
-#                     pos += 1
-
-
 @contextlib.contextmanager
 def cd(path):
     '''Creates the path if it doesn't exist'''
@@ -302,6 +135,9 @@ def new_feed_id(entry, cache={}):
 PATH = dirname(abspath(__file__))
 DATA = settings.BILLY_DATA_DIR
 
+# Feed entries are written to mongo in bulk batches of this size.
+SAVE_BATCH_SIZE = 500
+
 
 class Extractor(object):
 
@@ -359,28 +195,36 @@ class Extractor(object):
     def metadata(self):
         return metadata(self.abbr)
 
-    def extract_bill(self, m, collection=db.bills, cache={}):
-        '''Given a match object m, return the _id of the related bill.
-        '''
-        def squish(bill_id):
-            bill_id = ''.join(bill_id.split())
-            bill_id = bill_id.upper().replace('.', '')
-            return bill_id
-
-        bill_id = squish(m.group())
+    @staticmethod
+    def squish(bill_id):
+        bill_id = ''.join(bill_id.split())
+        bill_id = bill_id.upper().replace('.', '')
+        return bill_id
 
+    @property
+    def bill_ids(self):
+        '''This state's bills, as a dict of squished bill_id -> _id, like
+        {'SJC23': 'CAB000123'}. Built on first use and kept for the life
+        of the Extractor; call reset_bill_ids to rebuild it.
+        '''
         try:
-            ids = cache['ids']
-        except KeyError:
-            # Get a list of (bill_id, _id) tuples like ('SJC23', 'CAB000123')
-            ids = collection.find({'state': self.abbr}, {'bill_id': 1})
-            ids = dict((squish(r['bill_id']), r['_id']) for r in ids)
-
-            # Cache it in the method.
-            cache['ids'] = ids
-
-        if bill_id in ids:
-            return ids[bill_id]
+            return self._bill_ids
+        except AttributeError:
+            squish = self.squish
+            cursor = db.bills.find({'state': self.abbr},
+                                   {'_id': 1, 'bill_id': 1})
+            self._bill_ids = dict((squish(r['bill_id']), r['_id'])
+                                  for r in cursor)
+            self.logger.info('indexed %d bill ids' % len(self._bill_ids))
+            return self._bill_ids
+
+    def reset_bill_ids(self):
+        self.__dict__.pop('_bill_ids', None)
+
+    def extract_bill(self, m):
+        '''Given a match object m, return the _id of the related bill.
+        '''
+        return self.bill_ids.get(self.squish(m.group()))
 
     def committee_variations(self, committee):
         '''Compute likely variations for a committee
@@ -525,9 +369,26 @@ class Extractor(object):
 
             yield entry, matches
 
+    def save_entries(self, entries):
+        '''Upserts a batch of entries in one unordered bulk write.'''
+        if not entries:
+            return
+        # The writes aren't ordered, so only send the last of any repeats.
+        entries = collections.OrderedDict((e['_id'], e) for e in entries)
+        bulk = feed_db.entries.initialize_unordered_bulk_op()
+        for entry in entries.itervalues():
+            bulk.find({'_id': entry['_id']}).upsert().replace_one(entry)
+        bulk.execute()
+
     def process_feed(self, entries):
+        batch = []
+        try:
+            self._process_feed(entries, batch)
+        finally:
+            self.save_entries(batch)
+
+    def _process_feed(self, entries, batch):
         abbr = self.abbr
-        feed_entries = feed_db.entries
         third = itemgetter(2)
 
         # Find matching entities in the feed.
@@ -593,7 +454,10 @@ class Extractor(object):
                         return
 
             # Save
-            feed_entries.save(entry)
+            batch.append(entry)
+            if len(batch) >= SAVE_BATCH_SIZE:
+                self.save_entries(batch)
+                del batch[:]
             msg = 'Found %d related entities in %r'
             self.logger.info(msg % (len(ids), entry['title']))
 
@@ -612,6 +476,9 @@ class Extractor(object):
                     entries = json.load(f)
                     _process_feed(entries)
 
+        # Bills may have been added by the next run.
+        self.reset_bill_ids()
+
     def extract_entities(self, matches):
 
         funcs = {}